@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+from bitboard import iter_bits, run_starts
+from instrument import profiled
+
+CACHE_SIZE = 1024
+
+
+# Everything that depends only on the edges, worked out once per topology.
+# Lists are indexed by node number. Reachability is filled in per node on
+# first use, since a large board has far more nodes than any game needs.
+class TopologyMetrics:
+    def __init__(self, succ, pred, rows, cols):
+        num_nodes = rows * cols
+        self.succ = succ
+        self.pred = pred
+        self.degree = [s.bit_count() + p.bit_count() for s, p in zip(succ, pred)]
+        self.scale = 1 / (num_nodes - 1)
+        self.isolates = self.degree.count(0)
+        self._reach = {}
+        self._reach_degree = {}
+        self._clustering = None
+
+    @property
+    def centrality(self):
+        return [d * self.scale for d in self.degree]
+
+    def reach(self, n):
+        # mask of the nodes reachable from n, itself included
+        if n not in self._reach:
+            seen = frontier = 1 << n
+            while frontier:
+                reached = 0
+                for m in iter_bits(frontier):
+                    reached |= self.succ[m]
+                frontier = reached & ~seen
+                seen |= frontier
+            self._reach[n] = seen
+        return self._reach[n]
+
+    def reach_centrality(self, n):
+        # (sum, count) of degree centrality over the nodes reachable from n
+        if n not in self._reach_degree:
+            nodes = list(iter_bits(self.reach(n)))
+            self._reach_degree[n] = (sum(self.degree[m] for m in nodes), len(nodes))
+        total, count = self._reach_degree[n]
+        return total * self.scale, count
+
+    @property
+    def clustering(self):
+        # nx.average_clustering on the DiGraph. With no reciprocal edges the
+        # directed formula is triangles / (degree * (degree - 1)) over in | out
+        # neighbours; layered boards have no triangles, but this does not
+        # assume it
+        if self._clustering is None:
+            both = [s | p for s, p in zip(self.succ, self.pred)]
+            total = 0.0
+            for n, mask in enumerate(both):
+                degree = mask.bit_count()
+                if degree < 2:
+                    continue
+                links = sum((both[m] & mask).bit_count() for m in iter_bits(mask)) // 2
+                total += links / (degree * (degree - 1))
+            self._clustering = total / len(both)
+        return self._clustering
+
+
+_cache = OrderedDict()
+
+
+def topology_metrics(board):
+    # boards with the same edges share one TopologyMetrics; the cache keeps
+    # the CACHE_SIZE most recent topologies
+    key = (board.succ, board.rows, board.cols)
+    metrics = _cache.get(key)
+    if metrics is None:
+        metrics = _cache[key] = TopologyMetrics(board.succ, board.pred, board.rows, board.cols)
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return metrics
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def winning_starts(board, player):
+    # the first node of every fully owned path; these are the nodes
+    # bitboard.get_winning_nodes searches from
+    return run_starts(board, board.pieces[player], board.connect)
+
+
+@profiled
+def winning_centrality(board, player):
+    # (sum, count) of degree centrality over get_winning_nodes(board, player)
+    metrics = topology_metrics(board)
+    total = 0.0
+    count = 0
+    for n in iter_bits(winning_starts(board, player)):
+        node_total, node_count = metrics.reach_centrality(n)
+        total += node_total
+        count += node_count
+    return total, count
+
+
+def winning_centrality_values(board, player):
+    metrics = topology_metrics(board)
+    centrality = metrics.centrality
+    return [
+        centrality[m]
+        for n in iter_bits(winning_starts(board, player))
+        for m in iter_bits(metrics.reach(n))
+    ]
@@ -0,0 +1,169 @@
+import numpy as np
+
+from bitboard import ROWS, COLS, CONNECT
+from stats import SweepAggregate
+
+NUM_NODES = ROWS * COLS
+EMPTY, RED, BLUE = 0, 1, 2
+WINNER_LABELS = {EMPTY: "Tie", RED: "R", BLUE: "B"}
+
+
+# Every array is indexed by game first. adjacency[g, n, k] is the edge from
+# node n to column k of the next row, occupancy[g, n] holds EMPTY/RED/BLUE.
+def initialize_boards(p_value, num_games, rng):
+    draws = rng.uniform(0.1, 0.9, size=(num_games, (ROWS - 1) * COLS, COLS))
+    adjacency = np.zeros((num_games, NUM_NODES, COLS), dtype=bool)
+    adjacency[:, :(ROWS - 1) * COLS] = draws < p_value
+    return adjacency
+
+
+def number_of_isolates(adjacency):
+    has_out = adjacency.any(axis=2)
+    has_in = np.zeros_like(has_out)
+    for row in range(1, ROWS):
+        has_in[:, row * COLS:(row + 1) * COLS] = adjacency[:, (row - 1) * COLS:row * COLS].any(axis=1)
+    return (~(has_out | has_in)).sum(axis=1)
+
+
+def drop_pieces(adjacency, occupancy, games, columns, piece, rng):
+    # one random-walk step per row for every game at once, stopping a game
+    # as soon as its current node has no unoccupied successor
+    node = columns.astype(np.intp)
+    walking = np.ones(len(games), dtype=bool)
+    for row in range(ROWS - 1):
+        below = occupancy[games, (row + 1) * COLS:(row + 2) * COLS] == EMPTY
+        free = adjacency[games, node] & below & walking[:, None]
+        walking = free.any(axis=1)
+        if not walking.any():
+            break
+        keys = np.where(free, rng.random(free.shape), -1.0)
+        step = walking.nonzero()[0]
+        node[step] = (row + 1) * COLS + keys[step].argmax(axis=1)
+    occupancy[games, node] = piece
+    return node
+
+
+def chain_lengths(adjacency, own):
+    # run[g, n]: longest same-colored chain ending at n, built row by row
+    run = np.zeros(own.shape, dtype=np.int8)
+    run[:, :COLS] = own[:, :COLS]
+    for row in range(1, ROWS):
+        prev = run[:, (row - 1) * COLS:row * COLS]
+        edges = adjacency[:, (row - 1) * COLS:row * COLS]
+        longest = (edges * prev[:, :, None]).max(axis=1)
+        run[:, row * COLS:(row + 1) * COLS] = own[:, row * COLS:(row + 1) * COLS] * (1 + longest)
+    return run
+
+
+def winning_centrality(adjacency, occupancy, winners):
+    # matches sweep.simulate_game: the centrality of every node reachable
+    # from a node that starts a winning chain, counted once per such start
+    num_games = len(adjacency)
+    own = occupancy == winners[:, None]
+    down = np.zeros((num_games, NUM_NODES), dtype=np.int8)
+    reach = np.zeros((num_games, NUM_NODES, NUM_NODES), dtype=bool)
+    reach[:, np.arange(NUM_NODES), np.arange(NUM_NODES)] = True
+    for row in range(ROWS - 1, -1, -1):
+        nodes = slice(row * COLS, (row + 1) * COLS)
+        if row < ROWS - 1:
+            below = slice((row + 1) * COLS, (row + 2) * COLS)
+            edges = adjacency[:, nodes]
+            down[:, nodes] = own[:, nodes] * (1 + (edges * down[:, None, below]).max(axis=2))
+            reach[:, nodes] |= (edges[:, :, :, None] & reach[:, None, below]).any(axis=2)
+        else:
+            down[:, nodes] = own[:, nodes]
+
+    degree = adjacency.sum(axis=2)
+    for row in range(1, ROWS):
+        degree[:, row * COLS:(row + 1) * COLS] += adjacency[:, (row - 1) * COLS:row * COLS].sum(axis=1)
+    centrality = degree / (NUM_NODES - 1)
+
+    # at most NUM_NODES starts can reach a node, so uint8 counts cannot overflow
+    starts = (down >= CONNECT) & (winners[:, None] != EMPTY)
+    reached = np.einsum("gs,gsn->gn", starts.view(np.uint8), reach.view(np.uint8))
+    return (reached * centrality).sum(axis=1), reached.sum(axis=1, dtype=np.int64)
+
+
+def simulate_games(p_value, num_games, rng):
+    adjacency = initialize_boards(p_value, num_games, rng)
+    occupancy = np.zeros((num_games, NUM_NODES), dtype=np.int8)
+    winners = np.zeros(num_games, dtype=np.int8)
+    moves = np.full(num_games, NUM_NODES, dtype=np.int16)
+    live = np.arange(num_games)
+
+    # every game starts together, so all live games share the same turn
+    for turn in range(NUM_NODES):
+        if not len(live):
+            break
+        piece = RED if turn % 2 == 0 else BLUE
+        columns = rng.integers(0, COLS, size=len(live))
+        drop_pieces(adjacency, occupancy, live, columns, piece, rng)
+
+        run = chain_lengths(adjacency[live], occupancy[live] == piece)
+        won = (run >= CONNECT).any(axis=1)
+        winners[live[won]] = piece
+        moves[live[won]] = turn
+        live = live[~won]
+
+    centrality_total = np.zeros(num_games)
+    centrality_count = np.zeros(num_games, dtype=np.int64)
+    won = winners.nonzero()[0]
+    if len(won):
+        centrality_total[won], centrality_count[won] = winning_centrality(adjacency[won], occupancy[won], winners[won])
+    return {
+        "winner": winners,
+        "moves": moves,
+        "isolates": number_of_isolates(adjacency),
+        "centrality_total": centrality_total,
+        "centrality_count": centrality_count,
+    }
+
+
+def check_shape(shape):
+    # the arrays are laid out for the default board; larger boards need the
+    # python engine, whose win checks do not grow with the board
+    if tuple(shape) != (ROWS, COLS, CONNECT):
+        raise ValueError(f"the numpy engine only plays {ROWS}x{COLS} connect-{CONNECT} boards")
+
+
+def run_shard_records(p_value, seed, num_games, shape=(ROWS, COLS, CONNECT)):
+    # gamestore records; games in a batch share one generator, so the seed
+    # column holds the shard seed rather than a per-game seed
+    check_shape(shape)
+    outcomes = simulate_games(p_value, num_games, np.random.default_rng(seed))
+    return list(zip(
+        [p_value] * num_games,
+        [seed] * num_games,
+        outcomes["winner"].tolist(),
+        outcomes["moves"].tolist(),
+        outcomes["isolates"].tolist(),
+        outcomes["centrality_count"].tolist(),
+        outcomes["centrality_total"].tolist(),
+    ))
+
+
+def run_shard(p_value, seed, num_games, shape=(ROWS, COLS, CONNECT)):
+    # the same SweepAggregate as sweep.run_shard, so shards from either engine merge
+    check_shape(shape)
+    outcomes = simulate_games(p_value, num_games, np.random.default_rng(seed))
+    aggregate = SweepAggregate(p_value)
+    counts = np.bincount(outcomes["winner"], minlength=3)
+    for piece, label in WINNER_LABELS.items():
+        aggregate.results[label] = int(counts[piece])
+
+    for stats, histogram, values in (
+            (aggregate.moves, aggregate.moves_histogram, outcomes["moves"]),
+            (aggregate.isolates, aggregate.isolates_histogram, outcomes["isolates"])):
+        for value, times in enumerate(np.bincount(values).tolist()):
+            if times:
+                histogram.add(value, times)
+        values = values.astype(np.float64)
+        stats.add_moments(num_games, float(values.mean()), float(((values - values.mean()) ** 2).sum()))
+
+    x = outcomes["centrality_total"]
+    y = outcomes["centrality_count"].astype(np.float64)
+    dx = x - x.mean()
+    dy = y - y.mean()
+    aggregate.centrality.add_moments(
+        num_games, float(x.mean()), float(y.mean()), float((dx * dx).sum()), float((dy * dy).sum()), float((dx * dy).sum()))
+    return aggregate
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+
+import analytics
+import bitboard
+import mlpgraph
+import montecarlo
+import sweep
+
+SEED = 1234
+REPEAT = 5
+# slowdown of a case's median, beyond its own run-to-run spread, that
+# counts as a regression
+TOLERANCE = 0.25
+
+
+def seeded_board(p_value, num_moves, seed=SEED):
+    # replay seeds until one reaches num_moves without a winner, so the same
+    # board comes back on every run
+    while True:
+        rng = random.Random(seed)
+        board = bitboard.initialize_board(p_value, rng)
+        for turn in range(num_moves):
+            player = bitboard.PLAYERS[turn % 2]
+            move = bitboard.make_move(board, rng.randrange(board.cols), player, rng)
+            if bitboard.is_winning_move(board, move.node, player):
+                break
+        else:
+            return board
+        seed += 1
+
+
+def won_board(p_value, seed=SEED):
+    while True:
+        rng = random.Random(seed)
+        board = bitboard.initialize_board(p_value, rng)
+        for turn in range(board.rows * board.cols):
+            player = bitboard.PLAYERS[turn % 2]
+            move = bitboard.make_move(board, rng.randrange(board.cols), player, rng)
+            if bitboard.is_winning_move(board, move.node, player):
+                return board, player
+        seed += 1
+
+
+def seeded(func, seed=SEED):
+    # func(rng) with rng reset to the same state on every call, so each timed
+    # call plays the same board however many calls autorange picks
+    rng = random.Random(seed)
+    state = rng.getstate()
+
+    def case():
+        rng.setstate(state)
+        return func(rng)
+    return case
+
+
+def build_cases():
+    cases = {}
+
+    for p_value in (0.2, 0.5, 0.8):
+        cases[f"initialize_board[p={p_value}]"] = seeded(lambda rng, p_value=p_value: bitboard.initialize_board(p_value, rng))
+
+    board = seeded_board(0.5, 12)
+
+    def drop_and_undo(rng):
+        bitboard.make_move(board, rng.randrange(board.cols), "R", rng)
+        bitboard.undo_move(board)
+    cases["drop_piece"] = seeded(drop_and_undo)
+
+    for name, p_value, num_moves in (("sparse", 0.3, 6), ("dense", 0.6, 18), ("near_full", 0.3, 34)):
+        fixed = seeded_board(p_value, num_moves)
+        cases[f"is_winner[{name}]"] = lambda fixed=fixed: bitboard.is_winner(fixed, "R")
+
+    probe_board = seeded_board(0.5, 12)
+    cases["calculate_win_probabilities"] = lambda: montecarlo.estimate_win_probabilities(
+        probe_board, "R", rollouts=20, rng=random.Random(SEED))
+
+    finished, winner = won_board(0.5)
+
+    def winning_centrality():
+        centrality = bitboard.degree_centrality(finished)
+        return [centrality[node] for node in bitboard.get_winning_nodes(finished, winner)]
+    cases["get_winning_nodes+degree_centrality"] = winning_centrality
+
+    def topology_and_winning_centrality():
+        analytics.clear_cache()
+        return analytics.topology_metrics(finished).isolates, analytics.winning_centrality(finished, winner)
+    cases["analytics[topology+winning_centrality]"] = topology_and_winning_centrality
+
+    for p_value in (0.3, 0.6):
+        cases[f"simulate_single_game[p={p_value}]"] = seeded(lambda rng, p_value=p_value: sweep.simulate_game(p_value, rng))
+
+    # a board too large for the path index, so wins use the run-length check
+    cases["simulate_single_game[30x30,connect=5]"] = seeded(lambda rng: sweep.simulate_game(0.5, rng, (30, 30, 5)))
+
+    # the array-backed MLP board: build plus one batch of random drops
+    def mlp_drops():
+        mlp_rng = np.random.default_rng(SEED)
+        return mlpgraph.create_mlp(2000, 300, 2000).random_paths(mlp_rng.integers(0, 2000, size=1000), mlp_rng)
+    cases["mlp_random_paths[300x2000,batch=1000]"] = mlp_drops
+
+    # a fresh interpreter running one headless game: import cost included
+    cli_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+    cases["cli_startup[game]"] = lambda: subprocess.run(
+        [sys.executable, cli_path, "game", "--seed", str(SEED)], check=True, stdout=subprocess.DEVNULL)
+
+    return cases
+
+
+def time_case(func, repeat=REPEAT):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    per_call = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {"calls": number, "best": min(per_call), "median": statistics.median(per_call), "worst": max(per_call)}
+
+
+def run_benchmarks(output_path=None, only=None, repeat=REPEAT):
+    random.seed(SEED)
+    results = {}
+    for name, func in build_cases().items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results[name] = time_case(func, repeat)
+        print(f"{name:45s} {results[name]['best'] * 1e6:12.2f} us")
+
+    report = {"python": platform.python_version(), "seed": SEED, "cases": results}
+    if output_path:
+        with open(output_path, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    return report
+
+
+def spread(result):
+    # how far a case's repeats ranged, relative to their median; results
+    # saved before "worst" was recorded count as noiseless
+    return (result.get("worst", result["median"]) - result["best"]) / result["median"]
+
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    # a case regresses when its median is slower than the baseline median by
+    # more than tolerance plus the larger spread of the two runs
+    regressions = []
+    for name, result in current["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        before = baseline["cases"][name]
+        ratio = result["median"] / before["median"]
+        limit = 1 + tolerance + max(spread(before), spread(result))
+        flag = "REGRESSION" if ratio > limit else ""
+        print(f"{name:45s} {ratio:8.2f}x  (limit {limit:.2f}x) {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game core.")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed median slowdown beyond the run-to-run spread")
+    parser.add_argument("--only", nargs="*", help="run only cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.output, args.only, args.repeat)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(baseline, report, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,512 @@
+import hashlib
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+from instrument import profiled
+
+ROWS = 6
+COLS = 6
+CONNECT = 4
+PLAYERS = ("R", "B")
+# Boards with more edge draws than BULK_DRAWS are generated with numpy, and
+# a path index is only built while it stays under PATH_LIMIT masks.
+BULK_DRAWS = 1 << 12
+PATH_LIMIT = 1 << 16
+DEAD_PATH_LIMIT = 128
+
+# One entry of a board's undo stack: where the piece landed, whose piece it
+# replaced (drop_piece may land on an occupied top node) and the path taken.
+Move = namedtuple("Move", ["player", "node", "previous", "path"])
+
+# Zobrist keys come from a fixed seed so hashes are stable between runs.
+SIDE_KEY = random.Random("zobrist-side").getrandbits(64)
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(num_nodes):
+    rng = random.Random(f"zobrist-{num_nodes}")
+    return {player: tuple(rng.getrandbits(64) for _ in range(num_nodes)) for player in PLAYERS}
+
+
+# Nodes are numbered row by row, so (i, j) is bit i * cols + j of a mask.
+# succ[n] holds the edges from node n into the next layer as a bitmask and
+# pieces holds one occupancy mask per player. The topology never changes
+# during a game, so on small boards every directed connect-node path is
+# enumerated once as a mask (win_paths) and filed under each node it passes
+# (node_paths). Large boards have far too many paths for that; there both
+# are None and wins are found by following owned runs through succ / pred.
+# position_key is the Zobrist hash of the pieces and side to move, kept up
+# to date by every move and undo.
+class Board:
+    def __init__(self, succ, rows=ROWS, cols=COLS, path_index=None, connect=CONNECT, pred=None):
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.succ = succ
+        self._pred = pred
+        if path_index is None and count_paths_bound(succ, connect) <= PATH_LIMIT:
+            path_index = build_path_index(succ, rows * cols, connect)
+        self.win_paths, self.node_paths = path_index or (None, None)
+        self.pieces = {"R": 0, "B": 0}
+        self.history = []
+        self.piece_keys = zobrist_keys(rows * cols)
+        self.position_key = 0
+        self._topology_key = None
+        self._node_path_ids = None
+        self.liveness = None
+
+    def copy(self):
+        board = Board(self.succ, self.rows, self.cols, (self.win_paths, self.node_paths), self.connect, self._pred)
+        board.pieces = dict(self.pieces)
+        board.history = list(self.history)
+        board.position_key = self.position_key
+        board._topology_key = self._topology_key
+        board._node_path_ids = self._node_path_ids
+        if self.liveness is not None:
+            blocked, live = self.liveness
+            board.liveness = ({player: list(counts) for player, counts in blocked.items()}, dict(live))
+        return board
+
+    @property
+    def pred(self):
+        if self._pred is None:
+            pred = [0] * (self.rows * self.cols)
+            for n, mask in enumerate(self.succ):
+                for m in iter_bits(mask):
+                    pred[m] |= 1 << n
+            self._pred = tuple(pred)
+        return self._pred
+
+    @property
+    def size(self):
+        # the number of moves after which a game without a winner is a tie
+        return self.rows * self.cols
+
+    @property
+    def topology_key(self):
+        if self._topology_key is None:
+            # the masks as fixed-width bytes; repr of big ints is quadratic
+            width = (self.rows * self.cols + 7) // 8
+            digest = hashlib.blake2b(digest_size=8)
+            digest.update(self.rows.to_bytes(4, "little") + self.cols.to_bytes(4, "little"))
+            for mask in self.succ:
+                digest.update(mask.to_bytes(width, "little"))
+            digest = digest.digest()
+            self._topology_key = int.from_bytes(digest, "big")
+        return self._topology_key
+
+    @property
+    def zobrist(self):
+        return self.topology_key ^ self.position_key
+
+    @property
+    def turn(self):
+        return len(self.history)
+
+    @property
+    def occupied(self):
+        return self.pieces["R"] | self.pieces["B"]
+
+
+def node_index(board, node):
+    return node[0] * board.cols + node[1]
+
+
+def node_position(board, index):
+    return divmod(index, board.cols)
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def nth_bit(mask, k):
+    # index of the k-th lowest set bit, by halving mask on its bit counts,
+    # so a wide board's row costs a few steps rather than one per set bit
+    base = (mask & -mask).bit_length() - 1
+    mask >>= base
+    width = mask.bit_length()
+    while width > 1:
+        half = width // 2
+        lower = mask & ((1 << half) - 1)
+        count = lower.bit_count()
+        if k < count:
+            mask = lower
+            width = half
+        else:
+            k -= count
+            mask >>= half
+            base += half
+            width -= half
+    return base
+
+
+def count_paths_bound(succ, length=CONNECT):
+    # every node times the widest fan-out per step: cheap, and never below
+    # the real number of paths
+    widest = max(mask.bit_count() for mask in succ)
+    return len(succ) * widest ** (length - 1)
+
+
+def build_path_index(succ, num_nodes, length=CONNECT):
+    pred = [0] * num_nodes
+    for n, mask in enumerate(succ):
+        for m in iter_bits(mask):
+            pred[m] |= 1 << n
+    succ_lists = [tuple(iter_bits(mask)) for mask in succ]
+    pred_lists = [tuple(iter_bits(mask)) for mask in pred]
+
+    # suffixes[k][n] / prefixes[k][n] hold every path of k + 1 nodes that
+    # starts / ends at n, so the paths through n are prefix | suffix pairs
+    suffixes = [[[1 << n] for n in range(num_nodes)]]
+    prefixes = [suffixes[0]]
+    for k in range(1, length):
+        suffixes.append([
+            [(1 << n) | mask for m in succ_lists[n] for mask in suffixes[k - 1][m]]
+            for n in range(num_nodes)
+        ])
+        prefixes.append([
+            [(1 << n) | mask for m in pred_lists[n] for mask in prefixes[k - 1][m]]
+            for n in range(num_nodes)
+        ])
+
+    win_paths = [mask for paths in suffixes[-1] for mask in paths]
+    node_paths = tuple(
+        [
+            head | tail
+            for k in range(length)
+            for head in prefixes[k][n]
+            for tail in suffixes[length - 1 - k][n]
+        ]
+        for n in range(num_nodes)
+    )
+    return win_paths, node_paths
+
+
+@profiled
+def initialize_board(p_value, rng=random, rows=ROWS, cols=COLS, connect=CONNECT):
+    if (rows - 1) * cols * cols > BULK_DRAWS:
+        return _initialize_bulk(p_value, rng, rows, cols, connect)
+    succ = []
+    for i in range(rows):
+        for j in range(cols):
+            mask = 0
+            if i < rows - 1:
+                for k in range(cols):
+                    # same draw order as the networkx board, so seeds carry over
+                    a = rng.uniform(0.1, 0.9)
+                    if a < p_value:
+                        mask |= 1 << ((i + 1) * cols + k)
+            succ.append(mask)
+    return Board(tuple(succ), rows, cols, connect=connect)
+
+
+def _initialize_bulk(p_value, rng, rows, cols, connect):
+    # all edges in one numpy draw seeded from rng, packed straight into the
+    # succ and pred masks a row of bytes at a time
+    import numpy as np
+
+    edges = 0.1 + 0.8 * np.random.default_rng(rng.getrandbits(64)).random((rows - 1, cols, cols)) < p_value
+    out_bytes = np.packbits(edges, axis=2, bitorder="little")
+    in_bytes = np.packbits(edges.transpose(0, 2, 1), axis=2, bitorder="little")
+    succ = [0] * (rows * cols)
+    pred = [0] * (rows * cols)
+    for i in range(rows - 1):
+        for j in range(cols):
+            succ[i * cols + j] = int.from_bytes(out_bytes[i, j].tobytes(), "little") << ((i + 1) * cols)
+            pred[(i + 1) * cols + j] = int.from_bytes(in_bytes[i, j].tobytes(), "little") << (i * cols)
+    return Board(tuple(succ), rows, cols, connect=connect, pred=tuple(pred))
+
+
+def get_piece(board, node):
+    bit = 1 << node_index(board, node)
+    for player in PLAYERS:
+        if board.pieces[player] & bit:
+            return player
+    return None
+
+
+def neighbors(board, node):
+    return [node_position(board, n) for n in iter_bits(board.succ[node_index(board, node)])]
+
+
+def place_piece(board, index, player):
+    bit = 1 << index
+    for other in PLAYERS:
+        if board.pieces[other] & bit:
+            board.pieces[other] ^= bit
+            board.position_key ^= board.piece_keys[other][index]
+    board.pieces[player] |= bit
+    board.position_key ^= board.piece_keys[player][index]
+
+
+@profiled
+def make_move(board, column, player, rng=random):
+    # anything else would be a node index further down the board
+    if not 0 <= column < board.cols:
+        raise ValueError(f"column {column} is outside 0..{board.cols - 1}")
+    # First, occupy the specified node
+    node = column
+    path_taken = [node]
+
+    # Travel down the graph randomly among unoccupied neighbors
+    empty = ~board.occupied
+    while True:
+        free = board.succ[node] & empty
+        if not free:
+            break
+        # randrange draws exactly as rng.choice(list(iter_bits(free))) does
+        node = nth_bit(free, rng.randrange(free.bit_count()))
+        path_taken.append(node)
+
+    return apply_move(board, node_position(board, node), player, [node_position(board, n) for n in path_taken])
+
+
+def apply_move(board, node, player, path=None):
+    # put player's piece on node as one reversible move; make_move uses it
+    # after the random descent and search code uses it for a chosen landing
+    move = Move(player, node, get_piece(board, node), path if path is not None else [node])
+    index = node_index(board, node)
+    place_piece(board, index, player)
+    board.position_key ^= SIDE_KEY
+    board.history.append(move)
+    if board.liveness is not None and index >= board.cols:
+        update_liveness(board, index, player, 1)
+    return move
+
+
+def undo_move(board):
+    move = board.history.pop()
+    index = node_index(board, move.node)
+    if board.liveness is not None and index >= board.cols:
+        update_liveness(board, index, move.player, -1)
+    board.pieces[move.player] &= ~(1 << index)
+    board.position_key ^= board.piece_keys[move.player][index] ^ SIDE_KEY
+    if move.previous is not None:
+        board.pieces[move.previous] |= 1 << index
+        board.position_key ^= board.piece_keys[move.previous][index]
+    return move
+
+
+def drop_piece(board, column, player, rng=random):
+    return make_move(board, column, player, rng).path
+
+
+def run_length(board, index, mine, links):
+    # nodes on the longest run of mine that starts at index and follows
+    # links (succ or pred), capped at board.connect
+    frontier = 1 << index
+    length = 1
+    while length < board.connect:
+        reached = 0
+        for n in iter_bits(frontier):
+            reached |= links[n]
+        frontier = reached & mine
+        if not frontier:
+            break
+        length += 1
+    return length
+
+
+def run_starts(board, mine, length):
+    # nodes of mine that start a run of length nodes of mine
+    owned = list(iter_bits(mine))
+    starts = mine
+    for _ in range(length - 1):
+        starts = sum(1 << n for n in owned if board.succ[n] & starts)
+    return starts
+
+
+def completes_path(board, index, mine):
+    # whether mine (which holds index) has a connect-node path through index
+    if board.node_paths is not None:
+        return any(mask & mine == mask for mask in board.node_paths[index])
+    down = run_length(board, index, mine, board.succ)
+    return down >= board.connect or down + run_length(board, index, mine, board.pred) - 1 >= board.connect
+
+
+@profiled
+def check_winning_sequence(board, start_node, player, visited=None):
+    index = node_index(board, start_node)
+    mine = board.pieces[player]
+    if board.node_paths is None:
+        return bool(mine >> index & 1) and run_length(board, index, mine, board.succ) >= board.connect
+    # paths run top to bottom, so a path starts at its lowest set bit
+    start = 1 << index
+    for mask in board.node_paths[index]:
+        if mask & -mask == start and mask & mine == mask:
+            return True
+    return False
+
+
+@profiled
+def is_winner(board, player):
+    mine = board.pieces[player]
+    if board.win_paths is None:
+        return bool(run_starts(board, mine, board.connect))
+    for mask in board.win_paths:
+        if mask & mine == mask:
+            return True
+    return False
+
+
+@profiled
+def is_winning_move(board, node, player):
+    # a new piece can only complete paths that pass through its own cell
+    return completes_path(board, node_index(board, node), board.pieces[player])
+
+
+def other_player(player):
+    return "R" if player == "B" else "B"
+
+
+def fillable_nodes(board):
+    # nodes some drop can land on: the top row and everything below it that
+    # the edges reach. The rest stay empty for the whole game
+    seen = frontier = (1 << board.cols) - 1
+    while frontier:
+        reached = 0
+        for n in iter_bits(frontier):
+            reached |= board.succ[n]
+        frontier = reached & ~seen
+        seen |= frontier
+    return seen
+
+
+def open_nodes(board, player):
+    # nodes that may still hold player's piece when the game ends. Only a
+    # drop onto a full top-row column replaces a piece, so an opponent piece
+    # below the top row is there for good
+    top = (1 << board.cols) - 1
+    return fillable_nodes(board) & ~(board.pieces[other_player(player)] & ~top)
+
+
+def start_liveness(board):
+    # blocked[player][i] counts what keeps player from ever completing
+    # win_paths[i], live[player] how many paths have nothing in the way.
+    # apply_move and undo_move keep both up to date from here on
+    if board._node_path_ids is None:
+        ids = {mask: i for i, mask in enumerate(board.win_paths)}
+        board._node_path_ids = tuple([ids[mask] for mask in paths] for paths in board.node_paths)
+    blocked = {}
+    live = {}
+    for player in PLAYERS:
+        closed = ~open_nodes(board, player)
+        blocked[player] = [(mask & closed).bit_count() for mask in board.win_paths]
+        live[player] = blocked[player].count(0)
+    board.liveness = (blocked, live)
+
+
+def update_liveness(board, index, player, step):
+    # player's piece arrives at (step 1) or leaves (step -1) a node below
+    # the top row, which closes or reopens those paths for the opponent
+    blocked, live = board.liveness
+    opponent = other_player(player)
+    counts = blocked[opponent]
+    for i in board._node_path_ids[index]:
+        counts[i] += step
+        if counts[i] == (1 if step > 0 else 0):
+            live[opponent] -= step
+
+
+def tracks_dead_positions(board):
+    # whether simulations should call is_dead every turn. Boards with more
+    # than DEAD_PATH_LIMIT paths practically never run dry before the board
+    # fills up, and keeping their counts costs more than the moves it saves
+    return board.win_paths is not None and len(board.win_paths) <= DEAD_PATH_LIMIT
+
+
+@profiled
+def is_dead(board):
+    # True once neither player can complete any path, so the game can only
+    # end in a tie. Boards with a path index answer from the incremental
+    # counts; larger ones search the open nodes on every call
+    if board.win_paths is None:
+        return not any(run_starts(board, open_nodes(board, player), board.connect) for player in PLAYERS)
+    if board.liveness is None:
+        start_liveness(board)
+    live = board.liveness[1]
+    return not live["R"] and not live["B"]
+
+
+def reachable_nodes(board, node):
+    # same node set as the keys of nx.shortest_path(G, source=node)
+    start = node_index(board, node)
+    seen = 1 << start
+    order = [start]
+    frontier = seen
+    while frontier:
+        reached = 0
+        for n in iter_bits(frontier):
+            reached |= board.succ[n]
+        frontier = reached & ~seen
+        seen |= frontier
+        order.extend(iter_bits(frontier))
+    return [node_position(board, n) for n in order]
+
+
+@profiled
+def get_winning_nodes(board, player):
+    winning_nodes = []
+
+    for n in iter_bits(board.pieces[player]):
+        node = node_position(board, n)
+        if check_winning_sequence(board, node, player):
+            winning_nodes.extend(reachable_nodes(board, node))
+    return winning_nodes
+
+
+@profiled
+def degree_centrality(board):
+    # in + out degree over n - 1, as nx.degree_centrality on the DiGraph
+    degree = [bin(mask).count("1") for mask in board.succ]
+    for mask in board.succ:
+        for m in iter_bits(mask):
+            degree[m] += 1
+    scale = 1 / (board.rows * board.cols - 1)
+    return {node_position(board, n): d * scale for n, d in enumerate(degree)}
+
+
+@profiled
+def number_of_isolates(board):
+    has_edge = 0
+    for n, mask in enumerate(board.succ):
+        if mask:
+            has_edge |= (1 << n) | mask
+    return board.rows * board.cols - has_edge.bit_count()
+
+
+def print_board(board):
+    for i in range(board.rows):
+        for j in range(board.cols):
+            piece = get_piece(board, (i, j))
+            print(f"{piece if piece else '-'}", end=" ")
+        print()
+
+
+def to_networkx(board):
+    import networkx as nx
+
+    G = nx.DiGraph()
+    for n in range(board.rows * board.cols):
+        node = node_position(board, n)
+        G.add_node(node, piece=get_piece(board, node))
+    for n, mask in enumerate(board.succ):
+        for m in iter_bits(mask):
+            G.add_edge(node_position(board, n), node_position(board, m))
+    return G
+
+
+def from_networkx(G, rows=ROWS, cols=COLS, connect=CONNECT):
+    succ = [0] * (rows * cols)
+    for (i, j), (k, l) in G.edges:
+        succ[i * cols + j] |= 1 << (k * cols + l)
+    board = Board(tuple(succ), rows, cols, connect=connect)
+    for node, piece in G.nodes(data="piece"):
+        if piece is not None:
+            place_piece(board, node_index(board, node), piece)
+    return board
@@ -0,0 +1,262 @@
+import argparse
+import sys
+import time
+
+# Only argparse is imported up front. Every command imports what it needs,
+# so a headless sweep never loads matplotlib, networkx or tkinter.
+
+
+def p_range(p_min, p_max, p_step):
+    count = int(round((p_max - p_min) / p_step)) + 1
+    return tuple(round(p_min + i * p_step, 10) for i in range(count))
+
+
+def run_sweep_command(args):
+    if args.profile or args.trace:
+        import instrument
+        instrument.enable(args.trace)
+    import sweep
+
+    start = time.perf_counter()
+    if args.corpus:
+        rows = sweep.run_corpus_sweep(args.corpus, seed=args.seed, workers=args.workers,
+                                      csv_file_path=args.output, shard_size=args.shard_size, connect=args.connect)
+        report_sweep(rows, time.perf_counter() - start, args.output)
+        return
+
+    p_values = tuple(args.p) if args.p else p_range(args.p_min, args.p_max, args.p_step)
+    rows = sweep.run_sweep(
+        p_values,
+        args.games,
+        seed=args.seed,
+        workers=args.workers,
+        csv_file_path=args.output,
+        shard_size=args.shard_size,
+        engine=args.engine,
+        stream_path=args.stream,
+        resume=args.resume,
+        game_log=args.game_log,
+        shape=(args.rows, args.cols, args.connect),
+    )
+    report_sweep(rows, time.perf_counter() - start, args.output)
+
+    if args.stream and args.export_csv:
+        import gamestore
+        gamestore.export_csv(args.stream, args.export_csv)
+
+
+def report_sweep(rows, elapsed, output):
+    total = sum(row["Player R Wins"] + row["Player B Wins"] + row["Ties"] for row in rows)
+    print(f"{total} games in {elapsed:.1f}s ({total / elapsed:.0f} games/s), results in {output}")
+
+
+def run_corpus_command(args):
+    import corpus
+    start = time.perf_counter()
+    corpus.generate_corpus(args.output, args.p, args.count, seed=args.seed, rows=args.rows, cols=args.cols)
+    print(f"{args.count} boards in {time.perf_counter() - start:.1f}s, written to {args.output}")
+
+
+def run_tournament_command(args):
+    import tournament
+    start = time.perf_counter()
+    pairings, ratings = tournament.run_tournament(
+        args.policies,
+        tuple(args.p),
+        args.games,
+        seed=args.seed,
+        workers=args.workers,
+        block_size=args.block_size,
+        shape=(args.rows, args.cols, args.connect),
+        min_games=args.min_games,
+    )
+    tournament.print_report(pairings, ratings)
+    total = sum(pairing.games for pairing in pairings)
+    print(f"{total} games in {time.perf_counter() - start:.1f}s")
+    if args.output:
+        tournament.write_results(args.output, pairings)
+
+
+def run_game_command(args):
+    import random
+    import bitboard
+    import sweep
+
+    # the same steps as sweep.simulate_game, keeping the board for display
+    rng = random.Random(args.seed)
+    board = bitboard.initialize_board(args.p, rng, args.rows, args.cols, args.connect)
+    winner, num_moves, decided = sweep.play_random_game(board, rng)
+    print(f"winner={winner} moves={num_moves} isolates={bitboard.number_of_isolates(board)}"
+          + (f" dead from move {decided}" if decided is not None else ""))
+
+    if args.show or args.visual:
+        bitboard.print_board(board)
+        if args.visual:
+            import final
+            final.visualize_board(board, block=True)
+    if args.png:
+        import render
+        render.write_frame(board, args.png)
+
+
+def run_bench_command(args):
+    import benchmarks
+    argv = ["--repeat", str(args.repeat), "--tolerance", str(args.tolerance)]
+    if args.output:
+        argv += ["--output", args.output]
+    if args.baseline:
+        argv += ["--baseline", args.baseline]
+    if args.only:
+        argv += ["--only", *args.only]
+    return benchmarks.main(argv)
+
+
+def run_play_command(args):
+    import final
+    final.play_connect_four(args.rows, args.cols, args.connect, frames=args.frames)
+
+
+def run_render_command(args):
+    import render
+    from gamelog import GameLog
+    game_ids = args.games if args.games else range(len(GameLog(args.game_log)))
+    start = time.perf_counter()
+    paths = render.render_games(args.game_log, list(game_ids), args.output_dir, workers=args.workers,
+                                final_only=args.final_only)
+    print(f"{len(paths)} games rendered in {time.perf_counter() - start:.1f}s, written to {args.output_dir}")
+
+
+def run_serve_command(args):
+    import server
+    return server.main(["--host", args.host, "--port", str(args.port), "--idle-timeout", str(args.idle_timeout)]
+                       + (["--workers", str(args.workers)] if args.workers else []))
+
+
+def run_loadtest_command(args):
+    import loadtest
+    argv = ["--players", str(args.players), "--connections", str(args.connections), "--duration", str(args.duration),
+            "--think", str(args.think), "--probabilities", str(args.probabilities),
+            "--suggestions", str(args.suggestions), "--host", args.host, "--port", str(args.port)]
+    if args.serve:
+        argv.append("--serve")
+    if args.workers:
+        argv += ["--workers", str(args.workers)]
+    if args.output:
+        argv += ["--output", args.output]
+    return loadtest.main(argv)
+
+
+def add_shape_arguments(parser, connect=True):
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=6)
+    if connect:
+        parser.add_argument("--connect", type=int, default=4, help="pieces in a row needed to win")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Connect four on random layered graphs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sweep_parser = commands.add_parser("sweep", help="simulate many games per p value and write the CSV")
+    sweep_parser.add_argument("--p", type=float, nargs="*", help="explicit p values (overrides the range)")
+    sweep_parser.add_argument("--p-min", type=float, default=0.1)
+    sweep_parser.add_argument("--p-max", type=float, default=0.9)
+    sweep_parser.add_argument("--p-step", type=float, default=0.1)
+    sweep_parser.add_argument("--games", type=int, default=1000, help="games per p value")
+    sweep_parser.add_argument("--seed", type=int, default=0)
+    sweep_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    sweep_parser.add_argument("--shard-size", type=int, default=10000)
+    sweep_parser.add_argument("--engine", choices=("python", "numpy"), default="python")
+    sweep_parser.add_argument("--output", default="connect_four_results.csv")
+    sweep_parser.add_argument("--stream", help="append per-game records to this binary file, with checkpoints")
+    sweep_parser.add_argument("--resume", action="store_true", help="continue an interrupted --stream sweep")
+    sweep_parser.add_argument("--export-csv", help="write the per-game records of --stream to this CSV")
+    sweep_parser.add_argument("--game-log", help="append every game's moves to this log (python engine only)")
+    sweep_parser.add_argument("--corpus", help="replay every board of this corpus file instead of drawing new ones")
+    sweep_parser.add_argument("--profile", action="store_true", help="print a profile summary at the end")
+    sweep_parser.add_argument("--trace", help="append a JSONL record per game to this file")
+    add_shape_arguments(sweep_parser)
+    sweep_parser.set_defaults(func=run_sweep_command)
+
+    corpus_parser = commands.add_parser("corpus", help="generate a file of seeded board topologies")
+    corpus_parser.add_argument("--p", type=float, required=True)
+    corpus_parser.add_argument("--count", type=int, default=1_000_000)
+    corpus_parser.add_argument("--seed", type=int, default=0)
+    corpus_parser.add_argument("--output", required=True)
+    add_shape_arguments(corpus_parser, connect=False)
+    corpus_parser.set_defaults(func=run_corpus_command)
+
+    tournament_parser = commands.add_parser("tournament", help="play move policies against each other")
+    tournament_parser.add_argument("--policies", nargs="+", default=["random", "heuristic", "greedy"],
+                                   choices=("random", "heuristic", "greedy", "montecarlo", "expectimax"))
+    tournament_parser.add_argument("--p", type=float, nargs="+", default=[0.3, 0.5, 0.7])
+    tournament_parser.add_argument("--games", type=int, default=100_000, help="most games per pairing")
+    tournament_parser.add_argument("--min-games", type=int, default=400, help="fewest games before a pairing may stop")
+    tournament_parser.add_argument("--block-size", type=int, default=100, help="board pairs per task")
+    tournament_parser.add_argument("--seed", type=int, default=0)
+    tournament_parser.add_argument("--workers", type=int, default=None)
+    tournament_parser.add_argument("--output", help="write one CSV row per pairing")
+    add_shape_arguments(tournament_parser)
+    tournament_parser.set_defaults(func=run_tournament_command)
+
+    game_parser = commands.add_parser("game", help="simulate a single random game")
+    game_parser.add_argument("--p", type=float, default=0.3)
+    game_parser.add_argument("--seed", type=int, default=0)
+    game_parser.add_argument("--show", action="store_true", help="print the final board")
+    game_parser.add_argument("--visual", action="store_true", help="draw the final board")
+    game_parser.add_argument("--png", help="save the final board to this PNG without a window")
+    add_shape_arguments(game_parser)
+    game_parser.set_defaults(func=run_game_command)
+
+    bench_parser = commands.add_parser("bench", help="run the benchmark suite")
+    bench_parser.add_argument("--output")
+    bench_parser.add_argument("--baseline")
+    bench_parser.add_argument("--tolerance", type=float, default=0.25)
+    bench_parser.add_argument("--repeat", type=int, default=5)
+    bench_parser.add_argument("--only", nargs="*")
+    bench_parser.set_defaults(func=run_bench_command)
+
+    play_parser = commands.add_parser("play", help="play interactively with move suggestions")
+    play_parser.add_argument("--frames", help="write a PNG of every position and a GIF of the game to this directory")
+    add_shape_arguments(play_parser)
+    play_parser.set_defaults(func=run_play_command)
+
+    render_parser = commands.add_parser("render", help="draw games from a --game-log off-screen")
+    render_parser.add_argument("--game-log", required=True)
+    render_parser.add_argument("--games", type=int, nargs="*", help="game ids (default: every game)")
+    render_parser.add_argument("--output-dir", required=True)
+    render_parser.add_argument("--final-only", action="store_true", help="one PNG of the final position per game")
+    render_parser.add_argument("--workers", type=int, default=None)
+    render_parser.set_defaults(func=run_render_command)
+
+    serve_parser = commands.add_parser("serve", help="host many games over JSON lines on TCP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--workers", type=int, default=None, help="processes for probabilities and suggestions")
+    serve_parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an idle game is dropped")
+    serve_parser.set_defaults(func=run_serve_command)
+
+    loadtest_parser = commands.add_parser("loadtest", help="drive a game server with simulated players")
+    loadtest_parser.add_argument("--host", default="127.0.0.1")
+    loadtest_parser.add_argument("--port", type=int, default=8765)
+    loadtest_parser.add_argument("--serve", action="store_true", help="start a local server for the run")
+    loadtest_parser.add_argument("--workers", type=int, default=None)
+    loadtest_parser.add_argument("--players", type=int, default=1000)
+    loadtest_parser.add_argument("--connections", type=int, default=64)
+    loadtest_parser.add_argument("--duration", type=float, default=10.0)
+    loadtest_parser.add_argument("--think", type=float, default=0.1, help="mean seconds between a player's moves")
+    loadtest_parser.add_argument("--probabilities", type=float, default=0.05)
+    loadtest_parser.add_argument("--suggestions", type=float, default=0.05)
+    loadtest_parser.add_argument("--output")
+    loadtest_parser.set_defaults(func=run_loadtest_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
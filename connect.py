@@ -1,146 +1,191 @@
 import tkinter as tk
+from collections import deque
 from tkinter import Entry, Button
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-import networkx as nx
-import random
-
-def create_mlp_graph(num_input_layers, num_hidden_layers, num_neurons_per_layer):
-    G = nx.DiGraph()
-
-    # Add input layer nodes
-    input_nodes = [f'Input{i}' for i in range(1, num_input_layers + 1)]
-    G.add_nodes_from(input_nodes, subset='input')
 
-    # Add hidden layers and connect them
-    for layer in range(1, num_hidden_layers + 1):
-        layer_nodes = [f'Hidden{layer}_{i}' for i in range(1, num_neurons_per_layer + 1)]
-        G.add_nodes_from(layer_nodes, subset='hidden')
-
-        if layer == 1:
-            # Connect input layer to the first hidden layer
-            for input_node in input_nodes:
-                for layer_node in layer_nodes:
-                    G.add_edge(input_node, layer_node, weight=0.5)
+import networkx as nx
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.colors import to_rgba, to_rgba_array
+from matplotlib.figure import Figure
+
+from mlpgraph import create_mlp
+
+# a redraw waits at most FRAME_MS (about 60 fps), and a falling piece rests
+# STEP_MS on every node of its path
+FRAME_MS = 16
+STEP_MS = 120
+NODE_SIZE = 800
+# above this many edges they are drawn as one line collection, since every
+# arrow is an artist of its own
+ARROW_LIMIT = 500
+# colors[node] is 0 for an empty node, else the player number
+COLORS = ('white', 'red', 'blue')
+
+
+# The nodes and edges are drawn once. Moves only change node face colors:
+# the node collection is animated, so a full draw leaves it out and keeps a
+# copy of everything else, and a frame is that copy plus the nodes blitted
+# onto the axes. Frames and piece steps run from tkinter after() callbacks,
+# so nothing blocks the event loop. Nodes are addressed by their position in
+# graph.nodes(), which is the node id for MLPGraph.to_networkx graphs.
+class BoardView:
+    def __init__(self, root, canvas, ax, graph, pos, node_size=NODE_SIZE):
+        self.root = root
+        self.canvas = canvas
+        self.ax = ax
+        self.nodes = nx.draw_networkx_nodes(graph, pos, nodelist=list(graph.nodes()), node_color='white',
+                                            node_size=node_size, ax=ax, edgecolors='black', linewidths=2)
+        self.nodes.set_animated(True)
+        nx.draw_networkx_edges(graph, pos, edge_color='gray', ax=ax, node_size=node_size,
+                               arrows=graph.number_of_edges() <= ARROW_LIMIT, arrowsize=20)
+        self.facecolors = to_rgba_array(['white'] * graph.number_of_nodes())
+        # what each node shows while no piece is passing over it
+        self.resting = self.facecolors.copy()
+        self.background = None
+        self.frame = None
+        self.steps = deque()
+        self.step_timer = None
+        self.passing = None
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        # full draws happen on start-up and resize; keep the new background
+        # and put the nodes on top before the canvas shows it
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.nodes)
+
+    def paint(self, node, color):
+        self.facecolors[node] = to_rgba(color)
+        self.nodes.set_facecolor(self.facecolors)
+        if self.frame is None:
+            self.frame = self.root.after(FRAME_MS, self.redraw)
+
+    def redraw(self):
+        # any number of paints since the last frame cost one blit
+        self.frame = None
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.nodes)
+        self.canvas.blit(self.ax.bbox)
+
+    def drop(self, path, color, landing=None):
+        # queue a piece falling along path; it stays on landing, if any
+        self.steps.extend((node, color, node == landing) for node in path)
+        if self.step_timer is None:
+            self.step()
+
+    def step(self):
+        self.step_timer = None
+        if self.passing is not None:
+            self.paint(self.passing, self.resting[self.passing])
+            self.passing = None
+        if not self.steps:
+            return
+        node, color, lands = self.steps.popleft()
+        if lands:
+            self.resting[node] = to_rgba(color)
         else:
-            # Connect previous hidden layer to the current hidden layer
-            prev_layer_nodes = [f'Hidden{layer - 1}_{i}' for i in range(1, num_neurons_per_layer + 1)]
-            for prev_node in prev_layer_nodes:
-                for current_node in layer_nodes:
-                    G.add_edge(prev_node, current_node, weight=0.5)
-
-    return G
-
-def get_random_path(graph, start_node):
-    path = [start_node]
-    current_node = start_node
-
-    while True:
-        neighbors = list(graph.neighbors(current_node))
-        if not neighbors:
-            break
-        next_node = random.choice(neighbors)
-        path.append(next_node)
-        current_node = next_node
-
-    return path
-
-# Create an MLP-like graph with 5 input nodes, 5 hidden layers (each with 5 neurons), and 1 output node
-mlp_graph = create_mlp_graph(num_input_layers=5, num_hidden_layers=5, num_neurons_per_layer=5)
-
-# Set color and border attributes for all nodes
-for node, data in mlp_graph.nodes(data=True):
-    mlp_graph.nodes[node]['color'] = 'white'
-    mlp_graph.nodes[node]['border_color'] = 'black'
-
-# Create a custom grid layout
-pos = {}
-for i, node in enumerate(mlp_graph.nodes()):
-    row = i // 5  # Adjust the number of nodes per row as needed
-    col = i % 5
-    pos[node] = (col, -row)
-
-# Create a Tkinter window
-root = tk.Tk()
-root.title("Connect Four - MLP Graph")
-
-# Create a Matplotlib figure with larger size
-fig, ax = plt.subplots(figsize=(6, 5))
-ax.set_title("Connect Four - MLP Graph")
-
-# Draw the graph on the Matplotlib figure with custom grid layout
-nx.draw_networkx_nodes(mlp_graph, pos, node_color=[mlp_graph.nodes[n]['color'] for n in mlp_graph.nodes], node_size=800, ax=ax, edgecolors=[mlp_graph.nodes[n]['border_color'] for n in mlp_graph.nodes], linewidths=2)
-nx.draw_networkx_edges(mlp_graph, pos, edge_color='gray', ax=ax, arrowsize=20)
-
-# Create a Tkinter canvas for the Matplotlib figure
-canvas = FigureCanvasTkAgg(fig, master=root)
-canvas_widget = canvas.get_tk_widget()
-canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-
-# Add a toolbar (optional)
-toolbar = tk.Frame(root)
-toolbar.pack(side=tk.TOP, fill=tk.BOTH, expand=0)
-toolbar.update()
-
-# Entry and Button for user input
-label1 = tk.Label(root, text="Player 1: Enter Node Number (1-5):")
-label1.pack(side=tk.LEFT, padx=10)
-entry1 = Entry(root)
-entry1.pack(side=tk.LEFT, padx=10)
-button1 = Button(root, text="Drop Piece", command=lambda: drop_piece(1))
-button1.pack(side=tk.LEFT, padx=10)
-
-label2 = tk.Label(root, text="Player 2: Enter Node Number (1-5):")
-label2.pack(side=tk.LEFT, padx=10)
-entry2 = Entry(root)
-entry2.pack(side=tk.LEFT, padx=10)
-button2 = Button(root, text="Drop Piece", command=lambda: drop_piece(2))
-button2.pack(side=tk.LEFT, padx=10)
-
-def drop_piece(player):
-    try:
-        entry = entry1 if player == 1 else entry2
-        player_node = f'Input{int(entry.get())}'
-
-        # Get random path for the player
-        path = get_random_path(mlp_graph, player_node)
-
-        # Update colors for the player nodes
-        color = 'red' if player == 1 else 'blue'
-        for i, node in enumerate(path):
-            if mlp_graph.nodes[node]['color'] == 'white':
-                # If it's the last node in the last layer, color it explicitly
-                if i == len(path) - 1 and 'Hidden' in node:
-                    mlp_graph.nodes[node]['color'] = color
-                    nx.draw_networkx_nodes(mlp_graph, pos, nodelist=[node], node_color=color, node_size=800, ax=ax, edgecolors='black', linewidths=2)
-                    canvas.draw()
-                    root.update()
-                    plt.pause(0.5)
-                    print(f"Player {player}: Node {node} colored in the last layer.")
-                    break  # Break the loop after coloring the final node
-
-                # Track the final position of the node and piece color
-                if 'Hidden' in node and i == len(path) - 1:
-                    mlp_graph.nodes[node]['final_position'] = color
-                    print(f"Player {player}: Node {node} is the final position.")
-
-            elif 'Hidden' in node:  # If the next node is already colored
-                # Choose some other node in the same layer
-                layer_nodes = [n for n in mlp_graph.nodes if f'Hidden{player}' in n]
-                available_nodes = [n for n in layer_nodes if mlp_graph.nodes[n]['color'] == 'white']
-                
-                if available_nodes:
-                    next_node = random.choice(available_nodes)
-                    path[i] = next_node
-                else:
-                    break  # If all nodes in the layer are colored, break the loop
-
-        root.update()
-        plt.pause(0.5)  # Pause for a short duration to visualize one step at a time
-
-    except ValueError:
-        print("Please enter a valid node number.")
-
-
-# Display the window
-root.mainloop()
+            self.passing = node
+        self.paint(node, color)
+        self.step_timer = self.root.after(STEP_MS, self.step)
+
+
+def main():
+    # An MLP-like board with 5 input nodes and 5 hidden layers of 5 neurons.
+    # The game runs on node ids; networkx names only exist for drawing
+    mlp_graph = create_mlp(num_inputs=5, num_hidden_layers=5, num_neurons_per_layer=5)
+    colors = np.zeros(mlp_graph.num_nodes, dtype=np.int8)
+    rng = np.random.default_rng()
+
+    # Create a custom grid layout
+    pos = {}
+    drawing = mlp_graph.to_networkx()
+    for i, node in enumerate(drawing.nodes()):
+        row = i // 5  # Adjust the number of nodes per row as needed
+        col = i % 5
+        pos[node] = (col, -row)
+
+    # Create a Tkinter window
+    root = tk.Tk()
+    root.title("Connect Four - MLP Graph")
+
+    # A bare Figure rather than pyplot, which would keep every figure alive
+    fig = Figure(figsize=(6, 5))
+    ax = fig.add_subplot()
+    ax.set_title("Connect Four - MLP Graph")
+
+    # Create a Tkinter canvas for the Matplotlib figure
+    canvas = FigureCanvasTkAgg(fig, master=root)
+    canvas_widget = canvas.get_tk_widget()
+    canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+
+    # Draw the graph once with the custom grid layout
+    view = BoardView(root, canvas, ax, drawing, pos)
+
+    # Add a toolbar (optional)
+    toolbar = tk.Frame(root)
+    toolbar.pack(side=tk.TOP, fill=tk.BOTH, expand=0)
+    toolbar.update()
+
+    def drop_piece(player):
+        try:
+            entry = entry1 if player == 1 else entry2
+            player_node = int(entry.get()) - 1
+            if not 0 <= player_node < mlp_graph.sizes[0]:
+                raise ValueError(player_node)
+
+            # Get random path for the player
+            path = [int(node) for node in mlp_graph.random_paths([player_node], rng)[0] if node >= 0]
+
+            # Update colors for the player nodes
+            landing = None
+            for i, node in enumerate(path):
+                layer = mlp_graph.layer_of(node)
+                if colors[node] == 0:
+                    # If it's the last node in the last layer, color it explicitly
+                    if i == len(path) - 1 and layer > 0:
+                        colors[node] = player
+                        landing = node
+                        print(f"Player {player}: Node {mlp_graph.name(node)} colored in the last layer.")
+                        break  # Break the loop after coloring the final node
+
+                elif layer > 0:  # If the next node is already colored
+                    # Choose some other node in the same layer
+                    layer_nodes = mlp_graph.layer(layer)
+                    available_nodes = layer_nodes[colors[layer_nodes] == 0]
+
+                    if len(available_nodes):
+                        path[i] = int(rng.choice(available_nodes))
+                    else:
+                        break  # If all nodes in the layer are colored, break the loop
+
+            # the move is decided; the view plays it back one step at a time
+            view.drop(path, COLORS[player], landing)
+
+        except ValueError:
+            print("Please enter a valid node number.")
+
+    # Entry and Button for user input
+    label1 = tk.Label(root, text="Player 1: Enter Node Number (1-5):")
+    label1.pack(side=tk.LEFT, padx=10)
+    entry1 = Entry(root)
+    entry1.pack(side=tk.LEFT, padx=10)
+    button1 = Button(root, text="Drop Piece", command=lambda: drop_piece(1))
+    button1.pack(side=tk.LEFT, padx=10)
+
+    label2 = tk.Label(root, text="Player 2: Enter Node Number (1-5):")
+    label2.pack(side=tk.LEFT, padx=10)
+    entry2 = Entry(root)
+    entry2.pack(side=tk.LEFT, padx=10)
+    button2 = Button(root, text="Drop Piece", command=lambda: drop_piece(2))
+    button2.pack(side=tk.LEFT, padx=10)
+
+    # Display the window
+    canvas.draw()
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from bitboard import ROWS, COLS, CONNECT, Board
+
+# A corpus file is HEADER followed by count fixed-width records. A record is
+# the (rows - 1) * cols * cols edge bits in initialize_board's draw order
+# (bit (i * cols + j) * cols + k is the edge (i, j) -> (i + 1, k)), packed
+# little-endian, so record i sits at a known offset and the file can be
+# memory-mapped.
+MAGIC = b"C4TOPO01"
+HEADER = struct.Struct("<8sdQQHH")
+CHUNK = 1 << 16
+
+
+def record_size(rows, cols):
+    return ((rows - 1) * cols * cols + 7) // 8
+
+
+def generate_corpus(path, p_value, count, seed=0, rows=ROWS, cols=COLS, chunk=CHUNK):
+    # one generator for the whole file, drawn in order, so the boards depend
+    # only on (p_value, seed) and not on the chunk size
+    rng = np.random.default_rng(seed)
+    num_edges = (rows - 1) * cols * cols
+    with open(path, "wb") as corpus_file:
+        corpus_file.write(HEADER.pack(MAGIC, p_value, seed, count, rows, cols))
+        for start in range(0, count, chunk):
+            # an edge exists when uniform(0.1, 0.9) < p, as in initialize_board
+            edges = 0.1 + 0.8 * rng.random((min(chunk, count - start), num_edges)) < p_value
+            corpus_file.write(np.packbits(edges, axis=1, bitorder="little").tobytes())
+
+
+class Corpus:
+    def __init__(self, path, connect=CONNECT):
+        with open(path, "rb") as corpus_file:
+            header = corpus_file.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a topology corpus")
+        _, self.p_value, self.seed, self.count, self.rows, self.cols = HEADER.unpack(header)
+        self.path = path
+        self.connect = connect
+        self.records = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size,
+                                 shape=(self.count, record_size(self.rows, self.cols)))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return Board(self.succ(index), self.rows, self.cols, connect=self.connect)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def succ(self, index):
+        bits = int.from_bytes(self.records[index].tobytes(), "little")
+        cols = self.cols
+        full = (1 << cols) - 1
+        succ = [((bits >> (n * cols)) & full) << ((n // cols + 1) * cols) for n in range((self.rows - 1) * cols)]
+        return tuple(succ + [0] * cols)
+
+    def edges(self, start=0, stop=None):
+        # boolean (boards, rows - 1, cols, cols) array for vectorized analysis
+        records = self.records[start:stop]
+        num_edges = (self.rows - 1) * self.cols * self.cols
+        bits = np.unpackbits(records, axis=1, count=num_edges, bitorder="little")
+        return bits.reshape(len(records), self.rows - 1, self.cols, self.cols).astype(bool)
+
+
+@lru_cache(maxsize=8)
+def open_corpus(path, connect=CONNECT):
+    # one memory map per file per process, shared by every shard it runs
+    return Corpus(path, connect)
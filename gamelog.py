@@ -0,0 +1,171 @@
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from bitboard import PLAYERS
+
+# A game log is two append-only files. path holds LOG_HEADER and then one
+# fixed-width move record per drop: the drop path length and the column of
+# the path in each row, so the landing cell is (length - 1, path[length - 1]).
+# The player is implicit, PLAYERS[move % 2]. path + ".idx" holds one INDEX
+# record per game: where its moves start, how many, the winner, p and the
+# topology reference, the game seed, which rebuilds the board through
+# initialize_board(p, random.Random(seed)).
+LOG_MAGIC = b"C4MOVES1"
+LOG_HEADER = struct.Struct("<8sHH")
+WINNER_CODES = {"Tie": 0, "R": 1, "B": 2}
+WINNER_LABELS = {code: label for label, code in WINNER_CODES.items()}
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("moves", "<u2"),
+    ("winner", "u1"),
+    ("p_value", "<f8"),
+    ("topology", "<u8"),
+])
+
+Game = namedtuple("Game", ["game_id", "p_value", "topology", "winner", "moves"])
+
+
+# the index keeps a game's move count in "<u2"
+MAX_NODES = 0xFFFF
+
+
+def move_dtype(rows, cols):
+    # a byte per field while the shape allows it, two bytes past that
+    length = "u1" if rows <= 0xFF else "<u2"
+    column = "u1" if cols <= 0x100 else "<u2"
+    return np.dtype([("length", length), ("path", column, (rows,))])
+
+
+def encode_moves(board):
+    # the history of a finished board as move records
+    records = np.zeros(len(board.history), dtype=move_dtype(board.rows, board.cols))
+    for i, move in enumerate(board.history):
+        records["length"][i] = len(move.path)
+        records["path"][i, :len(move.path)] = [col for _, col in move.path]
+    return records.tobytes()
+
+
+def read_header(path):
+    # (rows, cols) of the boards a log holds
+    with open(path, "rb") as log_file:
+        header = log_file.read(LOG_HEADER.size)
+    if len(header) < LOG_HEADER.size or header[:len(LOG_MAGIC)] != LOG_MAGIC:
+        raise ValueError(f"{path} is not a game log")
+    _, rows, cols = LOG_HEADER.unpack(header)
+    return rows, cols
+
+
+class GameRecorder:
+    def __init__(self, path, rows, cols):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        if rows * cols > MAX_NODES:
+            raise ValueError(f"game logs hold boards of up to {MAX_NODES} nodes, not {rows}x{cols}")
+        self.move_size = move_dtype(rows, cols).itemsize
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new:
+            # records of another shape would not line up with the old ones
+            log_shape = read_header(path)
+            if log_shape != (rows, cols):
+                raise ValueError(f"{path} logs {log_shape[0]}x{log_shape[1]} boards, not {rows}x{cols}")
+        self.moves_file = open(path, "ab")
+        self.index_file = open(self.index_path, "ab")
+        if new:
+            self.moves_file.write(LOG_HEADER.pack(LOG_MAGIC, rows, cols))
+        # cut a partial record left by a crash, so appends stay aligned
+        self.next_offset = (self.moves_file.tell() - LOG_HEADER.size) // self.move_size
+        self.moves_file.truncate(LOG_HEADER.size + self.next_offset * self.move_size)
+        self.index_file.truncate(self.index_file.tell() // INDEX_DTYPE.itemsize * INDEX_DTYPE.itemsize)
+
+    def record(self, board, winner, p_value, topology):
+        self.append(encode_moves(board), winner, p_value, topology)
+
+    def append(self, moves, winner, p_value, topology):
+        # moves are encode_moves bytes, so workers can encode and the parent
+        # only writes. Moves go first: an index entry never points past them
+        num_moves = len(moves) // self.move_size
+        entry = np.array([(self.next_offset, num_moves, WINNER_CODES[winner], p_value, topology)], dtype=INDEX_DTYPE)
+        self.moves_file.write(moves)
+        self.index_file.write(entry.tobytes())
+        self.next_offset += num_moves
+
+    def close(self):
+        self.moves_file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _map(path, dtype, offset=0):
+    # whole records only, so a crash mid-append leaves a readable log
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+
+class GameLog:
+    def __init__(self, path):
+        self.rows, self.cols = read_header(path)
+        self.moves = _map(path, move_dtype(self.rows, self.cols), LOG_HEADER.size)
+        self.index = _map(f"{path}.idx", INDEX_DTYPE)
+        # drop index entries whose moves did not make it to disk
+        if len(self.index) and self.index["offset"][-1] + self.index["moves"][-1] > len(self.moves):
+            complete = self.index["offset"] + self.index["moves"] <= len(self.moves)
+            self.index = self.index[:int(complete.sum())]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, game_id):
+        entry = self.index[game_id]
+        start = int(entry["offset"])
+        return Game(game_id, float(entry["p_value"]), int(entry["topology"]),
+                    WINNER_LABELS[int(entry["winner"])], self.moves[start:start + int(entry["moves"])])
+
+    def __iter__(self):
+        for game_id in range(len(self)):
+            yield self[game_id]
+
+    @property
+    def lengths(self):
+        return self.index["moves"]
+
+    @property
+    def winners(self):
+        return self.index["winner"]
+
+    @property
+    def p_values(self):
+        return self.index["p_value"]
+
+    def landings(self, moves=None):
+        # landing node of every move (or of the given move records)
+        moves = self.moves if moves is None else moves
+        last = moves["length"].astype(np.int64) - 1
+        return last * self.cols + moves["path"][np.arange(len(moves)), last]
+
+    def final_landings(self):
+        # landing node of the last move of every game: the winning cell,
+        # unless the game was a tie, and -1 for a game without moves (one dead
+        # from the start)
+        moves = self.index["moves"].astype(np.int64)
+        played = moves > 0
+        last = self.index["offset"][played].astype(np.int64) + moves[played] - 1
+        landings = np.full(len(moves), -1, dtype=np.int64)
+        landings[played] = self.landings(self.moves[last])
+        return landings
+
+    def paths(self, game_id):
+        # the drop paths of one game as drop_piece returned them
+        return [
+            (PLAYERS[i % 2], [(row, int(col)) for row, col in enumerate(move["path"][:move["length"]])])
+            for i, move in enumerate(self[game_id].moves)
+        ]
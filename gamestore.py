@@ -0,0 +1,138 @@
+import csv
+import json
+import os
+import struct
+from array import array
+
+# A stream file is MAGIC followed by blocks. Each block is BLOCK_MAGIC, the
+# record count, then every column stored contiguously in COLUMNS order, so
+# a reader can pull one column out of a block without touching the rest.
+MAGIC = b"C4GAMES1"
+BLOCK_MAGIC = b"BLK1"
+BLOCK_HEADER = struct.Struct("<4sI")
+COLUMNS = (
+    ("p_value", "d"),
+    ("seed", "Q"),
+    ("winner", "B"),
+    ("moves", "H"),
+    ("isolates", "H"),
+    ("centrality_count", "H"),
+    ("centrality_total", "d"),
+)
+# moves, isolates and centrality_count are "H" columns, each at most the
+# node count of the board
+MAX_NODES = 0xFFFF
+WINNER_CODES = {"Tie": 0, "R": 1, "B": 2}
+WINNER_LABELS = {code: label for label, code in WINNER_CODES.items()}
+
+
+class GameWriter:
+    def __init__(self, path, batch_size=4096, truncate_to=None):
+        # truncate_to drops anything written after the last checkpoint
+        if os.path.exists(path) and truncate_to is not None:
+            self.file = open(path, "r+b")
+            self.file.truncate(truncate_to)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(MAGIC)
+        self.batch_size = batch_size
+        self.buffer = {name: array(code) for name, code in COLUMNS}
+
+    def __len__(self):
+        return len(self.buffer["seed"])
+
+    def append(self, p_value, seed, winner, moves, isolates, centrality_count, centrality_total):
+        self.extend([(p_value, seed, WINNER_CODES[winner], moves, isolates, centrality_count, centrality_total)])
+
+    def extend(self, records):
+        # records are tuples in COLUMNS order with the winner already encoded
+        for record in records:
+            for (name, _), value in zip(COLUMNS, record):
+                self.buffer[name].append(value)
+            if len(self) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if not len(self):
+            return
+        self.file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(self)))
+        for name, code in COLUMNS:
+            self.file.write(self.buffer[name].tobytes())
+            self.buffer[name] = array(code)
+
+    def sync(self):
+        # flush buffered records and make them durable; returns the file size
+        self.flush()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_blocks(path, columns=None):
+    wanted = set(columns) if columns else {name for name, _ in COLUMNS}
+    with open(path, "rb") as stream:
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a game stream")
+        while True:
+            header = stream.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            magic, count = BLOCK_HEADER.unpack(header)
+            if magic != BLOCK_MAGIC:
+                raise ValueError(f"{path} has a corrupt block header")
+            block = {}
+            for name, code in COLUMNS:
+                size = count * array(code).itemsize
+                if name in wanted:
+                    block[name] = array(code)
+                    block[name].frombytes(stream.read(size))
+                else:
+                    stream.seek(size, os.SEEK_CUR)
+            yield block
+
+
+def read_columns(path, columns=None):
+    result = {}
+    for block in read_blocks(path, columns):
+        for name, values in block.items():
+            result.setdefault(name, array(values.typecode)).extend(values)
+    return result
+
+
+def export_csv(path, csv_file_path):
+    names = [name for name, _ in COLUMNS]
+    with open(csv_file_path, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(names)
+        for block in read_blocks(path):
+            winners = [WINNER_LABELS[code] for code in block["winner"]]
+            columns = [winners if name == "winner" else block[name] for name in names]
+            writer.writerows(zip(*columns))
+
+
+def write_checkpoint(path, state):
+    # write then rename, so a crash leaves either the old or the new file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as checkpoint_file:
+        return json.load(checkpoint_file)
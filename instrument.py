@@ -0,0 +1,128 @@
+import json
+import os
+import random
+import sys
+import time
+from functools import wraps
+
+# Switched on with CONNECT4_PROFILE=1 (CONNECT4_TRACE=path adds a per-game
+# JSONL trace) or enable(). Both must happen before the game modules are
+# imported: @profiled returns the function untouched while disabled, so
+# production runs pay nothing for it.
+ENABLED = os.environ.get("CONNECT4_PROFILE", "") not in ("", "0")
+TRACE_PATH = os.environ.get("CONNECT4_TRACE") or None
+RESERVOIR_SIZE = 4096
+
+# name -> [calls, total ns, latency sample]
+_functions = {}
+# counters for the game in progress and their totals over finished games
+_game = {}
+_totals = {}
+_num_games = 0
+# own generator, so sampling never disturbs the game RNG streams
+_sampler = random.Random(0)
+
+
+def enable(trace_path=None):
+    global ENABLED, TRACE_PATH
+    ENABLED = True
+    os.environ["CONNECT4_PROFILE"] = "1"
+    if trace_path:
+        TRACE_PATH = trace_path
+        os.environ["CONNECT4_TRACE"] = trace_path
+
+
+def profiled(func):
+    if not ENABLED:
+        return func
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter_ns() - start)
+    return wrapper
+
+
+def _record(name, elapsed):
+    stats = _functions.get(name)
+    if stats is None:
+        stats = _functions[name] = [0, 0, []]
+    stats[0] += 1
+    stats[1] += elapsed
+    sample = stats[2]
+    if len(sample) < RESERVOIR_SIZE:
+        sample.append(elapsed)
+    else:
+        slot = _sampler.randrange(stats[0])
+        if slot < RESERVOIR_SIZE:
+            sample[slot] = elapsed
+
+
+def count(name, value=1):
+    _game[name] = _game.get(name, 0) + value
+
+
+def end_game(**fields):
+    global _num_games
+    _num_games += 1
+    for name, value in _game.items():
+        _totals[name] = _totals.get(name, 0) + value
+    if TRACE_PATH:
+        line = json.dumps({**fields, **_game}) + "\n"
+        # one O_APPEND write per line keeps lines from several workers whole
+        fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+    _game.clear()
+
+
+def take_snapshot():
+    # hand this process's numbers to the parent and start over
+    global _num_games
+    snapshot = {"functions": dict(_functions), "totals": dict(_totals), "games": _num_games}
+    _functions.clear()
+    _totals.clear()
+    _num_games = 0
+    return snapshot
+
+
+def merge(snapshot):
+    global _num_games
+    for name, (calls, total, sample) in snapshot["functions"].items():
+        stats = _functions.setdefault(name, [0, 0, []])
+        stats[0] += calls
+        stats[1] += total
+        stats[2].extend(sample)
+        if len(stats[2]) > RESERVOIR_SIZE:
+            stats[2] = _sampler.sample(stats[2], RESERVOIR_SIZE)
+    for name, value in snapshot["totals"].items():
+        _totals[name] = _totals.get(name, 0) + value
+    _num_games += snapshot["games"]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def report(file=sys.stderr):
+    print(f"{'function':45s} {'calls':>10s} {'total s':>10s} {'p50 us':>10s} {'p90 us':>10s} {'p99 us':>10s}", file=file)
+    for name, (calls, total, sample) in sorted(_functions.items(), key=lambda item: -item[1][1]):
+        ordered = sorted(sample)
+        print(
+            f"{name:45s} {calls:10d} {total / 1e9:10.3f} "
+            f"{percentile(ordered, 0.5) / 1e3:10.1f} {percentile(ordered, 0.9) / 1e3:10.1f} "
+            f"{percentile(ordered, 0.99) / 1e3:10.1f}",
+            file=file,
+        )
+    if _num_games:
+        print(f"\n{_num_games} games", file=file)
+        for name, value in sorted(_totals.items()):
+            print(f"{name:45s} {value:14d} total {value / _num_games:10.2f} per game", file=file)
@@ -0,0 +1,68 @@
+import time
+from collections import OrderedDict
+
+from bitboard import completes_path, node_index, node_position
+from instrument import profiled
+
+CACHE_SIZE = 1 << 16
+
+_cache = OrderedDict()
+
+
+def _landing_masses(board, start, deadline=None):
+    # push probability mass down one layer at a time; mass stops at a node
+    # with no unoccupied successor, otherwise it splits evenly between them.
+    # Past deadline (a perf_counter time) it raises TimeoutError and caches
+    # nothing; on a large board one column can take a good part of a second
+    # topology_key stands in for succ, which is slow to hash on a big board
+    succ, occupied = board.succ, board.occupied
+    key = (board.topology_key, occupied, start)
+    landed = _cache.get(key)
+    if landed is not None:
+        _cache.move_to_end(key)
+        return landed
+    free_nodes = ~occupied
+    landed = {}
+    layer = {start: 1.0}
+    while layer:
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError("landing distribution ran past its deadline")
+        below = {}
+        for node, mass in layer.items():
+            free = succ[node] & free_nodes
+            if not free:
+                landed[node] = landed.get(node, 0.0) + mass
+                continue
+            count = free.bit_count()
+            while free:
+                low = free & -free
+                n = low.bit_length() - 1
+                below[n] = below.get(n, 0.0) + mass / count
+                free ^= low
+        layer = below
+    _cache[key] = landed
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return landed
+
+
+@profiled
+def landing_distribution(board, column, deadline=None):
+    # exact probability that drop_piece(board, column, ...) lands on each node,
+    # memoized on (topology, occupied cells, column)
+    masses = _landing_masses(board, node_index(board, (0, column)), deadline)
+    return {node_position(board, n): mass for n, mass in masses.items()}
+
+
+@profiled
+def immediate_win_probability(board, column, player, deadline=None):
+    mine = board.pieces[player]
+    probability = 0.0
+    for n, mass in _landing_masses(board, node_index(board, (0, column)), deadline).items():
+        if completes_path(board, n, mine | (1 << n)):
+            probability += mass
+    return probability
+
+
+def clear_cache():
+    _cache.clear()
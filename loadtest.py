@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from instrument import percentile
+from server import HOST, PORT
+
+# Many simulated players spread over a few connections. Each player starts
+# a game, asks for probabilities or a suggestion now and then, drops pieces
+# into random playable columns until the game ends, and starts over. Every
+# reply is timed from send to receipt and reported per op.
+CONNECTIONS = 64
+RAMP_SECONDS = 2.0
+
+
+class Connection:
+    def __init__(self, reader, writer, latencies, errors):
+        self.reader = reader
+        self.writer = writer
+        self.latencies = latencies
+        self.errors = errors
+        self.waiting = {}
+        self.next_id = 0
+        self.receiver = asyncio.create_task(self.receive())
+
+    @classmethod
+    async def open(cls, host, port, latencies, errors):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 16)
+        return cls(reader, writer, latencies, errors)
+
+    async def receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            future = self.waiting.pop(reply["id"], None)
+            if future is not None and not future.done():
+                future.set_result(reply)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("server closed the connection"))
+
+    async def request(self, op, **fields):
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        start = time.perf_counter()
+        self.writer.write(json.dumps({"id": self.next_id, "op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        reply = await future
+        self.latencies.setdefault(op, []).append(time.perf_counter() - start)
+        if not reply["ok"]:
+            self.errors[op] = self.errors.get(op, 0) + 1
+        return reply
+
+    async def close(self):
+        self.writer.close()
+        self.receiver.cancel()
+
+
+async def play(connection, rng, deadline, args):
+    while time.perf_counter() < deadline:
+        reply = await connection.request("new", p=args.p, seed=rng.getrandbits(32))
+        game, cols = reply["game"], reply["cols"]
+        playable = set(range(cols))
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < args.probabilities:
+                await connection.request("probabilities", game=game, rollouts=args.rollouts)
+            elif roll < args.probabilities + args.suggestions:
+                await connection.request("suggest", game=game, time_budget=args.time_budget)
+            reply = await connection.request("move", game=game, column=rng.choice(sorted(playable)))
+            if not reply["ok"] or reply["winner"]:
+                break
+            row, column = reply["path"][-1]
+            if row == 0:
+                playable.discard(column)
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+        await connection.request("close", game=game)
+
+
+async def run_load(args):
+    latencies = {}
+    errors = {}
+    connections = [await Connection.open(args.host, args.port, latencies, errors)
+                   for _ in range(min(args.connections, args.players))]
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    deadline = start + args.duration
+
+    async def player(k):
+        # starts are spread over the ramp so the first second is not one burst
+        await asyncio.sleep(args.ramp * k / args.players)
+        await play(connections[k % len(connections)], random.Random(rng.getrandbits(64)), deadline, args)
+
+    await asyncio.gather(*(player(k) for k in range(args.players)))
+    elapsed = time.perf_counter() - start
+    for connection in connections:
+        await connection.close()
+    return latencies, errors, elapsed
+
+
+def summarize(latencies, errors, elapsed):
+    report = {}
+    for op, values in sorted(latencies.items()):
+        ordered = sorted(values)
+        report[op] = {
+            "requests": len(ordered),
+            "errors": errors.get(op, 0),
+            "per_second": len(ordered) / elapsed,
+            "p50_ms": percentile(ordered, 0.5) * 1e3,
+            "p99_ms": percentile(ordered, 0.99) * 1e3,
+            "max_ms": ordered[-1] * 1e3,
+        }
+    return report
+
+
+def print_report(report, elapsed):
+    print(f"{'op':15s} {'requests':>10s} {'errors':>8s} {'req/s':>10s} {'p50 ms':>10s} {'p99 ms':>10s} {'max ms':>10s}")
+    for op, row in report.items():
+        print(f"{op:15s} {row['requests']:10d} {row['errors']:8d} {row['per_second']:10.1f} "
+              f"{row['p50_ms']:10.2f} {row['p99_ms']:10.2f} {row['max_ms']:10.2f}")
+    total = sum(row["requests"] for row in report.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.0f} req/s)")
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind((HOST, 0))
+        return probe.getsockname()[1]
+
+
+def start_server(port, workers):
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    command = [sys.executable, server_path, "--port", str(port)]
+    if workers:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command)
+    for _ in range(100):
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the game server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--serve", action="store_true", help="start a local server on a free port for the run")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for a --serve server")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=CONNECTIONS, help="sockets the players share")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--ramp", type=float, default=RAMP_SECONDS, help="seconds over which players join")
+    parser.add_argument("--think", type=float, default=0.1, help="mean seconds between a player's moves")
+    parser.add_argument("--p", type=float, default=0.4)
+    parser.add_argument("--probabilities", type=float, default=0.05, help="share of turns that ask for probabilities")
+    parser.add_argument("--suggestions", type=float, default=0.05, help="share of turns that ask for a suggestion")
+    parser.add_argument("--rollouts", type=int, default=16)
+    parser.add_argument("--time-budget", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the per-op summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.serve:
+        args.host, args.port = HOST, free_port()
+        process = start_server(args.port, args.workers)
+    try:
+        latencies, errors, elapsed = asyncio.run(run_load(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = summarize(latencies, errors, elapsed)
+    print_report(report, elapsed)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"elapsed": elapsed, "players": args.players, "ops": report}, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import numpy as np
+
+# An MLP-shaped board as index arrays. Layer 0 holds the inputs, the rest
+# the hidden layers, and every edge runs from a layer to the next one.
+# Nodes are integers numbered layer by layer, so layer l is
+# range(offsets[l], offsets[l + 1]). links[l] holds the edges from layer l
+# to layer l + 1: None when the two are fully connected, which is how an
+# MLP is built and costs nothing to store, or a CSR pair (indptr, indices)
+# over the local node numbers of the two layers.
+
+
+class MLPGraph:
+    def __init__(self, sizes, links=None):
+        self.sizes = tuple(int(size) for size in sizes)
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes))).astype(np.int64)
+        self.links = list(links) if links is not None else [None] * (len(self.sizes) - 1)
+        if len(self.links) != len(self.sizes) - 1:
+            raise ValueError("need one set of links between each pair of layers")
+
+    @property
+    def num_layers(self):
+        return len(self.sizes)
+
+    @property
+    def num_nodes(self):
+        return int(self.offsets[-1])
+
+    @property
+    def num_edges(self):
+        return sum(self.sizes[l] * self.sizes[l + 1] if links is None else len(links[1])
+                   for l, links in enumerate(self.links))
+
+    def layer_of(self, node):
+        return int(np.searchsorted(self.offsets, node, side="right")) - 1
+
+    def layer(self, l):
+        return np.arange(self.offsets[l], self.offsets[l + 1])
+
+    def successors(self, node):
+        l = self.layer_of(node)
+        if l == self.num_layers - 1:
+            return np.zeros(0, dtype=np.int64)
+        links = self.links[l]
+        if links is None:
+            return self.layer(l + 1)
+        indptr, indices = links
+        local = node - self.offsets[l]
+        return indices[indptr[local]:indptr[local + 1]] + self.offsets[l + 1]
+
+    def random_paths(self, starts, rng=None):
+        # one random walk per start, all in the same layer, stepping every
+        # walk at once. Row k is the path from starts[k], one column per
+        # layer from there on, padded with -1 after a node with no successor
+        rng = np.random.default_rng() if rng is None else rng
+        starts = np.asarray(starts, dtype=np.int64)
+        first = self.layer_of(starts[0]) if len(starts) else 0
+        paths = np.full((len(starts), self.num_layers - first), -1, dtype=np.int64)
+        paths[:, 0] = starts
+        local = starts - self.offsets[first]
+        walking = np.ones(len(starts), dtype=bool)
+        for l in range(first, self.num_layers - 1):
+            links = self.links[l]
+            if links is None:
+                step = rng.integers(0, self.sizes[l + 1], size=len(local))
+            else:
+                indptr, indices = links
+                begin = indptr[local]
+                degree = indptr[local + 1] - begin
+                walking &= degree > 0
+                if not len(indices):
+                    break
+                step = indices[np.minimum(begin + (rng.random(len(local)) * degree).astype(np.int64), len(indices) - 1)]
+            if not walking.any():
+                break
+            local = np.where(walking, step, 0)
+            paths[walking, l + 1 - first] = local[walking] + self.offsets[l + 1]
+        return paths
+
+    def name(self, node):
+        # the node names connect.create_mlp_graph used
+        l = self.layer_of(node)
+        i = int(node - self.offsets[l]) + 1
+        return f"Input{i}" if l == 0 else f"Hidden{l}_{i}"
+
+    def to_networkx(self):
+        # string-named DiGraph for drawing, with nodes in id order
+        import networkx as nx
+        G = nx.DiGraph()
+        names = [self.name(node) for node in range(self.num_nodes)]
+        for l in range(self.num_layers):
+            G.add_nodes_from(names[self.offsets[l]:self.offsets[l + 1]], subset="input" if l == 0 else "hidden")
+        for l in range(self.num_layers - 1):
+            G.add_edges_from(((names[u], names[v]) for u in self.layer(l) for v in self.successors(u)), weight=0.5)
+        return G
+
+
+def links_from_adjacency(adjacency):
+    # CSR links from a boolean (size of layer l, size of layer l + 1) array
+    rows, cols = np.nonzero(adjacency)
+    indptr = np.zeros(adjacency.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=adjacency.shape[0]), out=indptr[1:])
+    return indptr, cols.astype(np.int64)
+
+
+def create_mlp(num_inputs, num_hidden_layers, num_neurons_per_layer):
+    # fully connected, so only the layer sizes are stored
+    return MLPGraph((num_inputs,) + (num_neurons_per_layer,) * num_hidden_layers)
+
+
+def random_mlp(num_inputs, num_hidden_layers, num_neurons_per_layer, p_value, rng=None):
+    # every edge of create_mlp kept with probability p_value
+    rng = np.random.default_rng() if rng is None else rng
+    graph = create_mlp(num_inputs, num_hidden_layers, num_neurons_per_layer)
+    graph.links = [links_from_adjacency(rng.random((graph.sizes[l], graph.sizes[l + 1])) < p_value)
+                   for l in range(graph.num_layers - 1)]
+    return graph
@@ -0,0 +1,121 @@
+import math
+import random
+import time
+
+from bitboard import make_move, undo_move, is_winning_move, get_piece
+from instrument import profiled
+from landing import immediate_win_probability
+
+
+class Tally:
+    def __init__(self, exact=None):
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+        # set when the score is known without sampling
+        self.exact = exact
+
+    @property
+    def rollouts(self):
+        return self.wins + self.losses + self.ties
+
+    @property
+    def score(self):
+        # a tie counts as half a win, as in the old 0.5 "assuming a tie"
+        if self.exact is not None:
+            return self.exact
+        n = self.rollouts
+        return (self.wins + 0.5 * self.ties) / n if n else 0.5
+
+    def half_width(self, z=1.96):
+        # one pseudo win and one pseudo loss keep the interval from
+        # collapsing to zero after a short run of identical outcomes
+        if self.exact is not None:
+            return 0.0
+        n = self.rollouts + 2
+        mean = (self.wins + 1 + 0.5 * self.ties) / n
+        mean_sq = (self.wins + 1 + 0.25 * self.ties) / n
+        return z * math.sqrt(max(mean_sq - mean * mean, 0.0) / n)
+
+    def __repr__(self):
+        if self.exact is not None:
+            return f"Tally(exact={self.exact})"
+        return f"Tally(wins={self.wins}, losses={self.losses}, ties={self.ties})"
+
+
+def playable_columns(board):
+    return [column for column in range(board.cols) if get_piece(board, (0, column)) is None]
+
+
+def rollout(board, column, player, rng=random, deadline=None):
+    # play column for player, then random drops for both sides until someone
+    # wins or the board's move limit is reached; the board is left unchanged.
+    # None if deadline (a perf_counter time) passes before the game ends,
+    # since one game on a large board can take most of a second
+    max_turns = board.rows * board.cols
+    opponent = "R" if player == "B" else "B"
+    mover = player
+    made = 0
+    try:
+        while True:
+            move = make_move(board, column, mover, rng)
+            made += 1
+            if is_winning_move(board, move.node, mover):
+                return mover
+            if board.turn >= max_turns:
+                return "Tie"
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            mover = opponent if mover == player else player
+            column = rng.randrange(board.cols)
+    finally:
+        for _ in range(made):
+            undo_move(board)
+
+
+@profiled
+def rollout_tallies(board, player, rollouts=None, half_width=0.1, z=1.96, batch=16,
+                    max_rollouts=500, time_budget=None, rng=random):
+    # rollouts=n plays exactly n games per column (reproducible with a seeded
+    # rng); otherwise each column is sampled in batches until its interval is
+    # within half_width or it hits max_rollouts. Either way sampling stops
+    # once time_budget seconds pass, and a game cut short is not counted
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    tallies = {}
+    for column in playable_columns(board):
+        # a column that wins wherever the piece lands needs no sampling
+        try:
+            certain = immediate_win_probability(board, column, player, deadline) == 1.0
+        except TimeoutError:
+            certain = False
+        tallies[column] = Tally(1.0 if certain else None)
+    if rollouts is not None:
+        batch = max_rollouts = rollouts
+    active = [column for column, tally in tallies.items() if tally.exact is None]
+
+    while active:
+        for column in active:
+            tally = tallies[column]
+            for _ in range(min(batch, max_rollouts - tally.rollouts)):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return tallies
+                winner = rollout(board, column, player, rng, deadline)
+                if winner is None:
+                    return tallies
+                if winner == player:
+                    tally.wins += 1
+                elif winner == "Tie":
+                    tally.ties += 1
+                else:
+                    tally.losses += 1
+
+        active = [
+            column for column in active
+            if tallies[column].rollouts < max_rollouts and tallies[column].half_width(z) > half_width
+        ]
+
+    return tallies
+
+
+def estimate_win_probabilities(board, player, **options):
+    return {column: tally.score for column, tally in rollout_tallies(board, player, **options).items()}
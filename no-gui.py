@@ -1,200 +1,102 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import os
 import random
 import csv
 
-def initialize_board(p_value):
-    G = nx.DiGraph()
-    for i in range(6):
-        for j in range(6):
-            G.add_node((i, j), piece=None)
-            if i < 5:
-                for k in range(6):
-                    # cerate a random number for the edge
-                    # if random value < p value : then write the edge
-                    a = random.uniform(0.1, 0.9)
-                    if a < p_value:
-                        G.add_edge((i, j), (i + 1, k))
-    return G
-
-
-def print_board(G):
-    for i in range(6):
-        for j in range(6):
-            piece = G.nodes[(i, j)]["piece"]
-            print(f"{piece if piece else '-'}", end=" ")
-        print()
-
-
-def visualize_board(G):
-    node_colors = []
-    for node in G.nodes:
-        piece = G.nodes[node]["piece"]
-        if piece == "R":
-            node_colors.append("red")
-        elif piece == "B":
-            node_colors.append("blue")
-        else:
-            node_colors.append("white")
-
-    pos = {node: (node[1], -node[0]) for node in G.nodes}
-    nx.draw(
-        G,
-        pos,
-        with_labels=False,
-        node_size=700,
-        node_color=node_colors,
-        edgecolors="black",
-    )
-    plt.show()
-
-def calculate_win_probabilities(G, player):
-    win_probabilities = {}
-
-    for column in range(6):
-        if G.nodes[(0, column)]["piece"] is None:
-            # Simulate dropping a piece in the current column
-            temp_G = G.copy()
-            drop_piece(temp_G, column, player)
-
-            # Check if the move results in a win for the player
-            if is_winner(temp_G, player):
-                win_probabilities[column] = 1.0
-            else:
-                # Simulate opponent's move and check if it leads to their win
-                opponent = "R" if player == "B" else "B"
-                opponent_wins = any(is_winner(temp_G, opponent) for _ in range(100))
-
-                # Assign win probability based on the opponent's likelihood of winning
-                if opponent_wins:
-                    win_probabilities[column] = 0.0
-                else:
-                    win_probabilities[column] = 0.5  # Assuming a tie
-
-    return win_probabilities
-
-def drop_piece(G, column, player):
-    path_taken = []
-
-    # First, occupy the specified node
-    node = (0, column)
-    path_taken.append(node)
-
-    # Travel down the graph randomly among unoccupied neighbors
-    while True:
-        neighbors = list(G.neighbors(node))
-        unoccupied_neighbors = [
-            neighbor for neighbor in neighbors if G.nodes[neighbor]["piece"] is None
-        ]
-
-        if not unoccupied_neighbors:
-            break
-
-        chosen_neighbor = random.choice(unoccupied_neighbors)
-        path = nx.shortest_path(G, source=node, target=chosen_neighbor)
-        path_taken.extend(path[1:])
-        node = chosen_neighbor
-
-    G.nodes[path_taken[-1]]["piece"] = player
-
-    return path_taken
-
-
-def is_winner(G, player):
-    for node in G.nodes:
-        if G.nodes[node]["piece"] == player:
-            if check_winning_sequence(G, node, player, set()):
-                return True
-    return False
-
-
-def check_winning_sequence(G, start_node, player, visited):
-    visited.add(start_node)
-
-    if len(visited) == 4:
-        return True
-
-    for neighbor in G.neighbors(start_node):
-        if G.nodes[neighbor]["piece"] == player and neighbor not in visited:
-            if check_winning_sequence(G, neighbor, player, visited.copy()):
-                return True
-
-    return False
-
-def get_winning_nodes(G, player):
-    winning_nodes = []
-
-    for node in G.nodes:
-        if G.nodes[node]["piece"] == player:
-            if check_winning_sequence(G, node, player, set()):
-                # print(nx.shortest_path(G, source=node, target=None))
-                winning_nodes.extend(nx.shortest_path(G, source=node, target=None))
-    return winning_nodes
+from bitboard import (
+    ROWS,
+    COLS,
+    CONNECT,
+    initialize_board,
+    print_board,
+    drop_piece,
+    is_dead,
+    is_winning_move,
+    node_index,
+    tracks_dead_positions,
+)
+from analytics import topology_metrics, winning_centrality_values
+from montecarlo import estimate_win_probabilities
+
+# rollouts per column for the probabilities the simulations print; they only
+# inform the log, so a fixed handful keeps them from dominating a game
+SIMULATION_ROLLOUTS = 8
+
+def visualize_board(board, block=False):
+    # plotting is imported here so headless runs never load matplotlib; the
+    # window is reused and only waits to be closed when block is set
+    import render
+    render.show_board(board, block)
+
+def calculate_win_probabilities(board, player, rollouts=None):
+    return estimate_win_probabilities(board, player, rollouts=rollouts)
 
 def play_connect_four():
-    G = initialize_board()
+    board = initialize_board()
     players = ["R", "B"]
     turn = 0
 
     while True:
-        # visualize_board(G)
-        # print_board(G)
+        # visualize_board(board)
+        # print_board(board)
         player = players[turn % 2]
-        column = int(input(f"{player}'s turn. Enter the column (0-5): "))
+        column = int(input(f"{player}'s turn. Enter the column (0-{board.cols - 1}): "))
 
-        if 0 <= column <= 5 and drop_piece(G, column, player):
-            if is_winner(G, player):
-                visualize_board(G)
-                print_board(G)
+        path_taken = drop_piece(board, column, player) if 0 <= column < board.cols else None
+        if path_taken:
+            if is_winning_move(board, path_taken[-1], player):
+                print_board(board)
                 print(f"{player} wins!")
+                visualize_board(board, block=True)
                 break
             turn += 1
         else:
             print("Invalid move. Try again.")
 
-def calculate_clustering_coefficient(G):
-    return (nx.average_clustering(G))
+def calculate_clustering_coefficient(board):
+    return topology_metrics(board).clustering
 
 
-def simulate_single_game_with_centrality(p_value):
-    G = initialize_board(p_value)
+def simulate_single_game_with_centrality(p_value, rows=ROWS, cols=COLS, connect=CONNECT):
+    board = initialize_board(p_value, rows=rows, cols=cols, connect=connect)
+    isolates = topology_metrics(board).isolates
     players = ["R", "B"]
     turn = 0
     total_centrality_values = []
     ev_ret = 0
-    # visualize_board(G)
-    # print_board(G)
+    # visualize_board(board)
+    # print_board(board)
 
     while True:
-        # visualize_board(G)
-        # print_board(G)
+        # visualize_board(board)
+        # print_board(board)
+        if tracks_dead_positions(board) and is_dead(board):
+            # nobody can connect any more, so the rest of the game is a tie
+            return "Tie", board.size, [], isolates
         player = players[turn % 2]
-        column = random.randint(0, 5)
-        isolates = nx.number_of_isolates(G)
+        column = random.randrange(board.cols)
 
-        if 0 <= column <= 5 and drop_piece(G, column, player):
-            win_probabilities_player = calculate_win_probabilities(G, player)
+        path_taken = drop_piece(board, column, player) if 0 <= column < board.cols else None
+        if path_taken:
+            win_probabilities_player = calculate_win_probabilities(board, player, SIMULATION_ROLLOUTS)
             opponent = "R" if player == "B" else "B"
-            win_probabilities_opponent = calculate_win_probabilities(G, opponent)
+            win_probabilities_opponent = calculate_win_probabilities(board, opponent, SIMULATION_ROLLOUTS)
 
             print(f"Win Probabilities for {player}: {win_probabilities_player}")
             print(f"Win Probabilities for {opponent}: {win_probabilities_opponent}")
 
-            if is_winner(G, player):
-                winning_nodes = get_winning_nodes(G, player)
-                centrality_values = calculate_degree_centrality(G, winning_nodes)
+            if is_winning_move(board, path_taken[-1], player):
+                centrality_values = winning_centrality_values(board, player)
 
                 return player, turn, centrality_values, isolates
             turn += 1
-            if turn == 36:
+            if turn == board.size:
                 return "Tie", turn, [], isolates
         else:
             pass
 
-def calculate_degree_centrality(G, nodes):
-    centrality_values = [nx.degree_centrality(G)[node] for node in nodes]
-    return centrality_values
+def calculate_degree_centrality(board, nodes):
+    centrality = topology_metrics(board).centrality
+    return [centrality[node_index(board, node)] for node in nodes]
 
 def simulate_connect_four_multiple_times_to_csv():
 
@@ -0,0 +1,203 @@
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from bitboard import PLAYERS, apply_move, initialize_board, iter_bits, node_position
+
+NODE_SIZE = 700
+FIGSIZE = (6, 5)
+DPI = 100
+FRAME_MS = 500
+COLORS = {"R": (1.0, 0.0, 0.0, 1.0), "B": (0.0, 0.0, 1.0, 1.0), None: (1.0, 1.0, 1.0, 1.0)}
+
+# What a frame needs from a board, cheap to take mid-game and to pickle
+Snapshot = namedtuple("Snapshot", ["succ", "rows", "cols", "pieces", "turn"])
+
+
+def snapshot(board):
+    return Snapshot(board.succ, board.rows, board.cols, dict(board.pieces), board.turn)
+
+
+@lru_cache(maxsize=16)
+def layout(rows, cols):
+    # (x, y) of every node, node n at column n % cols and row -(n // cols)
+    nodes = np.arange(rows * cols)
+    return np.column_stack((nodes % cols, -(nodes // cols))).astype(float)
+
+
+# Draws boards onto one reused figure. The nodes are drawn once per board
+# shape and the edges once per topology; a frame of the same game only
+# recolors the nodes. Without a figure it renders off-screen with Agg.
+class BoardRenderer:
+    def __init__(self, figure=None, node_size=NODE_SIZE):
+        if figure is None:
+            figure = Figure(figsize=FIGSIZE, dpi=DPI)
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        self.ax = figure.add_subplot()
+        self.ax.set_axis_off()
+        self.node_size = node_size
+        self.shape = None
+        self.succ = None
+        self.nodes = None
+        self.edges = None
+
+    def draw(self, board):
+        # board may be a Board or a Snapshot
+        positions = layout(board.rows, board.cols)
+        if (board.rows, board.cols) != self.shape:
+            if self.nodes is not None:
+                self.nodes.remove()
+            self.nodes = self.ax.scatter(positions[:, 0], positions[:, 1], s=self.node_size, c="white",
+                                         edgecolors="black", zorder=2)
+            self.ax.set_xlim(-0.5, board.cols - 0.5)
+            self.ax.set_ylim(-board.rows + 0.5, 0.5)
+            self.shape = (board.rows, board.cols)
+            self.succ = None
+        if board.succ != self.succ:
+            if self.edges is not None:
+                self.edges.remove()
+            segments = [(positions[n], positions[m]) for n, mask in enumerate(board.succ) for m in iter_bits(mask)]
+            self.edges = self.ax.add_collection(LineCollection(segments, colors="black", linewidths=1, zorder=1))
+            self.succ = board.succ
+        colors = np.tile(COLORS[None], (board.rows * board.cols, 1))
+        for player in PLAYERS:
+            colors[list(iter_bits(board.pieces[player]))] = COLORS[player]
+        self.nodes.set_facecolor(colors)
+
+    def to_rgba(self):
+        canvas = self.figure.canvas
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+    def save(self, path):
+        self.figure.savefig(path, dpi=DPI)
+
+
+_renderer = None
+
+
+def renderer():
+    # one off-screen renderer per process, for worker processes and
+    # FrameWriter
+    global _renderer
+    if _renderer is None:
+        _renderer = BoardRenderer()
+    return _renderer
+
+
+def write_frame(board, path):
+    renderer().draw(board)
+    renderer().save(path)
+    return path
+
+
+def write_gif(frames, path, frame_ms=FRAME_MS):
+    # frames are RGBA arrays from BoardRenderer.to_rgba
+    from PIL import Image
+    images = [Image.fromarray(frame).convert("RGB") for frame in frames]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=frame_ms, loop=0)
+    return path
+
+
+def render_snapshots(snapshots, path, frame_ms=FRAME_MS):
+    # a GIF of the given snapshots, one frame each
+    frames = []
+    for board in snapshots:
+        renderer().draw(board)
+        frames.append(renderer().to_rgba())
+    return write_gif(frames, path, frame_ms)
+
+
+def replay_snapshots(game_log, game_id):
+    # the board after every move of a logged sweep game. The topology comes
+    # back from the game seed, the pieces from the logged landing cells
+    game = game_log[game_id]
+    board = initialize_board(game.p_value, random.Random(game.topology), game_log.rows, game_log.cols)
+    snapshots = [snapshot(board)]
+    for i, node in enumerate(game_log.landings(game.moves).tolist()):
+        apply_move(board, node_position(board, node), PLAYERS[i % 2])
+        snapshots.append(snapshot(board))
+    return snapshots
+
+
+def render_game(log_path, game_id, path, frame_ms=FRAME_MS, final_only=False):
+    # one logged game as a GIF, or as a PNG of its final position
+    from gamelog import GameLog
+    snapshots = replay_snapshots(GameLog(log_path), game_id)
+    if final_only:
+        return write_frame(snapshots[-1], path)
+    return render_snapshots(snapshots, path, frame_ms)
+
+
+def render_games(log_path, game_ids, directory, workers=None, final_only=False, frame_ms=FRAME_MS):
+    # many logged games at once, one file per game, spread over processes
+    os.makedirs(directory, exist_ok=True)
+    extension = "png" if final_only else "gif"
+    paths = [os.path.join(directory, f"game_{game_id:08d}.{extension}") for game_id in game_ids]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_game, log_path, game_id, path, frame_ms, final_only)
+                   for game_id, path in zip(game_ids, paths)]
+        return [future.result() for future in futures]
+
+
+# Writes one PNG per submitted position from a background process, so the
+# game loop only pays for a snapshot. close() waits for the last frame and
+# can also put the frames together as a GIF.
+class FrameWriter:
+    def __init__(self, directory, prefix="turn"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.pool = ProcessPoolExecutor(max_workers=1)
+        self.futures = []
+
+    def submit(self, board):
+        path = os.path.join(self.directory, f"{self.prefix}_{board.turn:04d}.png")
+        self.futures.append(self.pool.submit(write_frame, snapshot(board), path))
+        return path
+
+    def close(self, gif_path=None, frame_ms=FRAME_MS):
+        paths = [future.result() for future in self.futures]
+        self.pool.shutdown()
+        if gif_path and paths:
+            from PIL import Image
+            write_gif([np.asarray(Image.open(path).convert("RGBA")) for path in paths], gif_path, frame_ms)
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_window = None
+
+
+def show_board(board, block=False):
+    # draw board in a pyplot window that stays open between calls, without
+    # stopping the caller unless block is set. Does nothing on a
+    # non-interactive backend
+    global _window
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    if matplotlib.get_backend().lower() in ("agg", "pdf", "ps", "svg", "cairo", "template"):
+        return
+    if _window is None or not plt.fignum_exists(_window.figure.number):
+        _window = BoardRenderer(plt.figure(figsize=FIGSIZE))
+    _window.draw(board)
+    _window.figure.canvas.draw_idle()
+    if block:
+        plt.show()
+    else:
+        plt.show(block=False)
+        _window.figure.canvas.flush_events()
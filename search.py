@@ -0,0 +1,241 @@
+import math
+import random
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from bitboard import apply_move, make_move, undo_move, is_winning_move, run_starts
+from instrument import profiled
+from landing import landing_distribution
+from montecarlo import playable_columns, rollout
+from transposition import TranspositionTable
+
+SearchResult = namedtuple("SearchResult", ["column", "value", "stats"])
+
+
+class _Timeout(TimeoutError):
+    pass
+
+
+def other_player(player):
+    return "R" if player == "B" else "B"
+
+
+def candidate_columns(board):
+    # once the top row is full drop_piece still lands on a top node
+    return playable_columns(board) or list(range(board.cols))
+
+
+@lru_cache(maxsize=None)
+def path_weights(length):
+    # weight of an open path (no opponent piece on it) by how many of its
+    # cells the player already holds: 0, 1, 4, 16, 64 for connect four
+    return (0,) + tuple(4 ** k for k in range(length))
+
+
+def evaluate(board, player):
+    # heuristic value in (0, 1) for the player to move
+    mine = board.pieces[player]
+    theirs = board.pieces[other_player(player)]
+    weights = path_weights(board.connect)
+    score = 0
+    if board.win_paths is None:
+        # too many paths to score one by one: count the owned runs instead
+        for length in range(1, board.connect):
+            score += weights[length] * (run_starts(board, mine, length).bit_count()
+                                        - run_starts(board, theirs, length).bit_count())
+    else:
+        for mask in board.win_paths:
+            if not mask & theirs:
+                score += weights[(mask & mine).bit_count()]
+            elif not mask & mine:
+                score -= weights[(mask & theirs).bit_count()]
+    return 0.5 + 0.5 * math.tanh(score / weights[-1])
+
+
+class Expectimax:
+    # max nodes pick a column, chance nodes average over the exact landing
+    # distribution of that column, values are from the mover's point of view
+    def __init__(self, table=None):
+        self.table = table if table is not None else TranspositionTable(1 << 18)
+        self.nodes = 0
+        self.deadline = None
+        self.partial = None
+
+    def search(self, board, player, time_budget=0.1, max_depth=None):
+        start = time.perf_counter()
+        max_depth = max_depth or board.rows * board.cols - board.turn
+        self.deadline = start + time_budget
+        self.partial = None
+        best = None
+        depth = 0
+        while depth < max_depth:
+            try:
+                best = self.best_column(board, player, depth + 1, root=True)
+            except TimeoutError:
+                # _Timeout from value(), or a landing distribution that
+                # ran out of time on a large board
+                break
+            depth += 1
+            if time.perf_counter() - start >= time_budget:
+                break
+        if best is None:
+            # not even one ply fit in the budget (a large board): the best
+            # column scored before time ran out, or else the first candidate
+            best = self.partial or (candidate_columns(board)[0], 0.5)
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "mode": "expectimax",
+            "nodes": self.nodes,
+            "depth": depth,
+            "seconds": elapsed,
+            "nodes_per_second": self.nodes / elapsed if elapsed else 0.0,
+            "table": self.table.stats(),
+        }
+        return SearchResult(best[0], best[1], stats)
+
+    def best_column(self, board, player, depth, root=False):
+        best_column, best_value = None, -1.0
+        for column in candidate_columns(board):
+            value = self.chance_value(board, column, player, depth)
+            if value > best_value:
+                best_column, best_value = column, value
+                if root and depth == 1:
+                    self.partial = best_column, best_value
+        return best_column, best_value
+
+    def chance_value(self, board, column, player, depth):
+        max_turns = board.rows * board.cols
+        value = 0.0
+        for node, probability in landing_distribution(board, column, self.deadline).items():
+            move = apply_move(board, node, player)
+            try:
+                if is_winning_move(board, move.node, player):
+                    outcome = 1.0
+                elif board.turn >= max_turns:
+                    outcome = 0.5
+                else:
+                    outcome = 1.0 - self.value(board, other_player(player), depth - 1)
+            finally:
+                undo_move(board)
+            value += probability * outcome
+        return value
+
+    def value(self, board, player, depth):
+        self.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _Timeout()
+        if depth == 0:
+            return evaluate(board, player)
+
+        key = board.zobrist
+        entry = self.table.lookup(key, depth)
+        if entry is not None:
+            return entry.value
+        column, value = self.best_column(board, player, depth)
+        self.table.store(key, depth, value, column)
+        return value
+
+
+class _TreeNode:
+    __slots__ = ("visits", "column_visits", "column_totals", "children")
+
+    def __init__(self, columns):
+        self.visits = 0
+        self.column_visits = dict.fromkeys(columns, 0)
+        self.column_totals = dict.fromkeys(columns, 0.0)
+        # children[column][landing node] is the position after that drop
+        self.children = {column: {} for column in columns}
+
+    def select(self, exploration):
+        best_column, best_score = None, -1.0
+        log_visits = math.log(self.visits + 1)
+        for column, visits in self.column_visits.items():
+            if not visits:
+                return column
+            score = self.column_totals[column] / visits + exploration * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best_column, best_score = column, score
+        return best_column
+
+
+class MCTS:
+    # UCT over columns; the random descent is sampled with make_move, so
+    # each column keeps one child per landing node it has produced
+    def __init__(self, exploration=1.4, rng=random):
+        self.exploration = exploration
+        self.rng = rng
+        self.nodes = 0
+        self.max_depth = 0
+        self.deadline = None
+
+    def search(self, board, player, time_budget=0.1):
+        start = time.perf_counter()
+        self.deadline = start + time_budget
+        root = _TreeNode(candidate_columns(board))
+        while True:
+            self.playout(board, root, player, 1)
+            if time.perf_counter() >= self.deadline:
+                break
+
+        elapsed = time.perf_counter() - start
+        if root.visits:
+            column = max(root.column_visits, key=root.column_visits.get)
+            value = root.column_totals[column] / root.column_visits[column]
+        else:
+            # the first rollout did not finish in time (a large board)
+            column, value = candidate_columns(board)[0], 0.5
+        stats = {
+            "mode": "mcts",
+            "nodes": self.nodes,
+            "playouts": root.visits,
+            "depth": self.max_depth,
+            "seconds": elapsed,
+            "nodes_per_second": self.nodes / elapsed if elapsed else 0.0,
+        }
+        return SearchResult(column, value, stats)
+
+    def playout(self, board, node, player, depth):
+        # the result for player, or None when the deadline cut the rollout
+        # short; a playout without a result leaves the tree as it was
+        self.nodes += 1
+        self.max_depth = max(self.max_depth, depth)
+        column = node.select(self.exploration)
+        opponent = other_player(player)
+        move = make_move(board, column, player, self.rng)
+        try:
+            if is_winning_move(board, move.node, player):
+                result = 1.0
+            elif board.turn >= board.rows * board.cols:
+                result = 0.5
+            else:
+                children = node.children[column]
+                child = children.get(move.node)
+                if child is None:
+                    winner = rollout(board, self.rng.randrange(board.cols), opponent, self.rng, self.deadline)
+                    if winner is None:
+                        return None
+                    children[move.node] = _TreeNode(candidate_columns(board))
+                    result = 1.0 if winner == player else 0.5 if winner == "Tie" else 0.0
+                else:
+                    result = self.playout(board, child, opponent, depth + 1)
+                    if result is None:
+                        return None
+                    result = 1.0 - result
+        finally:
+            undo_move(board)
+
+        node.visits += 1
+        node.column_visits[column] += 1
+        node.column_totals[column] += result
+        return result
+
+
+@profiled
+def search_best_move(board, player, time_budget=0.1, mode="expectimax", table=None, rng=random):
+    if mode == "expectimax":
+        return Expectimax(table).search(board, player, time_budget)
+    if mode == "mcts":
+        return MCTS(rng=rng).search(board, player, time_budget)
+    raise ValueError(f"Unknown search mode: {mode}")
@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from bitboard import ROWS, COLS, CONNECT, Board, apply_move, drop_piece, get_piece, initialize_board, is_winning_move
+from montecarlo import estimate_win_probabilities
+from search import search_best_move
+
+# One JSON object per line each way. A request is {"id": ..., "op": ...,
+# ...fields} and its reply {"id": ..., "ok": true, ...} or {"id": ...,
+# "ok": false, "error": ...}. Requests on a connection run concurrently and
+# replies carry the request id, so a client may pipeline; requests on one
+# game are applied in arrival order.
+HOST = "127.0.0.1"
+PORT = 8765
+IDLE_TIMEOUT = 300.0
+MAX_LINE = 1 << 16
+# caps on what one request may ask of the worker pool
+MAX_ROLLOUTS = 500
+MAX_TIME_BUDGET = 1.0
+# the largest board a game may ask for; boards with more than INLINE_NODES
+# nodes are drawn in the pool, since a path index on a small-to-medium board
+# can take a good fraction of a second to build
+MAX_SIDE = 100
+INLINE_NODES = ROWS * COLS
+
+
+class Game:
+    def __init__(self, board, rng):
+        self.board = board
+        self.rng = rng
+        self.winner = None
+        self.last_seen = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @property
+    def player(self):
+        return "RB"[self.board.turn % 2]
+
+    def state(self):
+        # what a worker needs to rebuild the position, history included so
+        # board.turn and the Zobrist keys come out the same
+        board = self.board
+        moves = tuple((move.player, move.node) for move in board.history)
+        return board.succ, board.rows, board.cols, board.connect, moves
+
+
+@lru_cache(maxsize=256)
+def _topology(succ, rows, cols, connect):
+    # games keep their topology, so a worker builds each path index once
+    return Board(succ, rows, cols, connect=connect)
+
+
+def rebuild(state):
+    succ, rows, cols, connect, moves = state
+    board = _topology(succ, rows, cols, connect).copy()
+    for player, node in moves:
+        apply_move(board, node, player)
+    return board
+
+
+def draw_topology(p_value, seed, rows, cols, connect):
+    # the game rng comes back too, so moves continue the seeded stream
+    rng = random.Random(seed)
+    return initialize_board(p_value, rng, rows, cols, connect).succ, rng
+
+
+def win_probabilities(state, player, rollouts, time_budget):
+    board = rebuild(state)
+    probabilities = estimate_win_probabilities(board, player, rollouts=rollouts, time_budget=time_budget)
+    return {str(column): value for column, value in probabilities.items()}
+
+
+def suggest_move(state, player, time_budget, mode):
+    result = search_best_move(rebuild(state), player, time_budget, mode)
+    return {"column": result.column, "value": result.value, "depth": result.stats.get("depth")}
+
+
+class GameServer:
+    def __init__(self, workers=None, idle_timeout=IDLE_TIMEOUT):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.idle_timeout = idle_timeout
+        self.games = {}
+        self.game_ids = itertools.count(1)
+        self.pending = 0
+        self.expired = 0
+        self.ops = {
+            "new": self.new_game,
+            "move": self.move,
+            "state": self.state,
+            "probabilities": self.probabilities,
+            "suggest": self.suggest,
+            "close": self.close_game,
+            "stats": self.stats,
+        }
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        expiry = asyncio.create_task(self.expire_games())
+        # SIGTERM unwinds through the finally below, so the pool workers go too
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+    async def expire_games(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 4, 10.0))
+            cutoff = time.monotonic() - self.idle_timeout
+            for game_id in [game_id for game_id, game in self.games.items() if game.last_seen < cutoff]:
+                del self.games[game_id]
+                self.expired += 1
+
+    async def handle_client(self, reader, writer):
+        tasks = set()
+        write_lock = asyncio.Lock()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self.respond(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            handler = self.ops.get(request.get("op"))
+            if handler is None:
+                raise ValueError(f"unknown op {request.get('op')!r}")
+            reply = {"id": request_id, "ok": True, **await handler(request)}
+        except Exception as error:
+            # anything a request sets off, a bad field or a broken pool, is
+            # that request's reply; the connection and the server carry on
+            reply = {"id": request_id, "ok": False, "error": str(error) or type(error).__name__}
+        async with write_lock:
+            writer.write(json.dumps(reply).encode() + b"\n")
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    def game(self, request):
+        game = self.games.get(request["game"])
+        if game is None:
+            raise ValueError(f"no game {request['game']!r}")
+        game.last_seen = time.monotonic()
+        return game
+
+    async def new_game(self, request):
+        p_value = float(request.get("p", 0.4))
+        rows, cols = int(request.get("rows", ROWS)), int(request.get("cols", COLS))
+        connect = int(request.get("connect", CONNECT))
+        if not (1 <= rows <= MAX_SIDE and 1 <= cols <= MAX_SIDE and 1 <= connect <= rows):
+            raise ValueError(f"boards are 1 to {MAX_SIDE} rows and columns, with 1 <= connect <= rows")
+        seed = request.get("seed")
+        if rows * cols <= INLINE_NODES:
+            rng = random.Random(seed)
+            board = initialize_board(p_value, rng, rows, cols, connect)
+        else:
+            # the loop's board skips the path index; its win checks follow
+            # runs instead, and workers build the index for their searches
+            succ, rng = await self.run_in_pool(draw_topology, p_value, seed, rows, cols, connect)
+            board = Board(succ, rows, cols, (None, None), connect)
+        game_id = next(self.game_ids)
+        self.games[game_id] = Game(board, rng)
+        return {"game": game_id, "rows": board.rows, "cols": board.cols, "player": "R"}
+
+    async def move(self, request):
+        game = self.game(request)
+        async with game.lock:
+            board = game.board
+            column = int(request["column"])
+            if game.winner is not None:
+                raise ValueError(f"game is over ({game.winner})")
+            if not 0 <= column < board.cols or get_piece(board, (0, column)) is not None:
+                raise ValueError(f"column {column} is not playable")
+            player = game.player
+            path = drop_piece(board, column, player, game.rng)
+            if is_winning_move(board, path[-1], player):
+                game.winner = player
+            elif board.turn == board.size or all(get_piece(board, (0, j)) for j in range(board.cols)):
+                # a full top row leaves no playable column
+                game.winner = "Tie"
+            return {"path": path, "winner": game.winner, "turn": board.turn, "player": game.player}
+
+    async def state(self, request):
+        game = self.game(request)
+        board = game.board
+        rows = [
+            "".join(get_piece(board, (i, j)) or "-" for j in range(board.cols))
+            for i in range(board.rows)
+        ]
+        return {"board": rows, "turn": board.turn, "player": game.player, "winner": game.winner}
+
+    async def run_in_pool(self, func, *args):
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def probabilities(self, request):
+        game = self.game(request)
+        async with game.lock:
+            state = game.state()
+        player = request.get("player") or game.player
+        rollouts = min(int(request.get("rollouts", 50)), MAX_ROLLOUTS)
+        # on a large board even a few rollouts per column take minutes
+        time_budget = min(float(request.get("time_budget", MAX_TIME_BUDGET)), MAX_TIME_BUDGET)
+        return {"probabilities": await self.run_in_pool(win_probabilities, state, player, rollouts, time_budget)}
+
+    async def suggest(self, request):
+        game = self.game(request)
+        async with game.lock:
+            state = game.state()
+        player = request.get("player") or game.player
+        time_budget = min(float(request.get("time_budget", 0.1)), MAX_TIME_BUDGET)
+        return await self.run_in_pool(suggest_move, state, player, time_budget, request.get("mode", "expectimax"))
+
+    async def close_game(self, request):
+        self.games.pop(request["game"], None)
+        return {}
+
+    async def stats(self, request):
+        return {"games": len(self.games), "pending": self.pending, "expired": self.expired}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many connect four games over JSON lines on TCP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None, help="processes for probabilities and suggestions")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds before an idle game is dropped")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.workers, args.idle_timeout)
+    print(f"serving on {args.host}:{args.port}", flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import math
+
+Z_95 = 1.959963984540054
+
+
+def wilson_interval(successes, n, z=Z_95):
+    # score interval for a proportion; successes may count ties as halves
+    if not n:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(max(p * (1 - p), 0.0) / n + z * z / (4 * n * n)) / denominator
+    return center - half, center + half
+
+
+# Welford's running mean and variance. merge() uses Chan's parallel update,
+# so shards can be summarized separately and combined in any grouping.
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def add_moments(self, count, mean, m2):
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def merge(self, other):
+        self.add_moments(other.count, other.mean, other.m2)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def half_width(self, z=Z_95):
+        return z * math.sqrt(self.variance / self.count) if self.count else 0.0
+
+
+# Running mean of per-game sums over per-game counts (e.g. the centrality of
+# all winning nodes over the number of them), with the co-moments needed
+# for a delta-method interval on the ratio.
+class RatioStats:
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def add(self, x, y):
+        self.count += 1
+        delta_x = x - self.mean_x
+        delta_y = y - self.mean_y
+        self.mean_x += delta_x / self.count
+        self.mean_y += delta_y / self.count
+        self.m2_x += delta_x * (x - self.mean_x)
+        self.m2_y += delta_y * (y - self.mean_y)
+        self.c_xy += delta_x * (y - self.mean_y)
+
+    def add_moments(self, count, mean_x, mean_y, m2_x, m2_y, c_xy):
+        if not count:
+            return
+        total = self.count + count
+        delta_x = mean_x - self.mean_x
+        delta_y = mean_y - self.mean_y
+        weight = self.count * count / total
+        self.m2_x += m2_x + delta_x * delta_x * weight
+        self.m2_y += m2_y + delta_y * delta_y * weight
+        self.c_xy += c_xy + delta_x * delta_y * weight
+        self.mean_x += delta_x * count / total
+        self.mean_y += delta_y * count / total
+        self.count = total
+
+    def merge(self, other):
+        self.add_moments(other.count, other.mean_x, other.mean_y, other.m2_x, other.m2_y, other.c_xy)
+
+    @property
+    def ratio(self):
+        return self.mean_x / self.mean_y if self.mean_y else 0.0
+
+    def half_width(self, z=Z_95):
+        if self.count < 2 or not self.mean_y:
+            return 0.0
+        r = self.ratio
+        var_x = self.m2_x / (self.count - 1)
+        var_y = self.m2_y / (self.count - 1)
+        cov = self.c_xy / (self.count - 1)
+        variance = (var_x - 2 * r * cov + r * r * var_y) / (self.count * self.mean_y ** 2)
+        return z * math.sqrt(max(variance, 0.0))
+
+
+# Exact counts of small non-negative integers (moves, isolates): constant
+# size for a given board, mergeable, and good for any quantile.
+class IntHistogram:
+    def __init__(self):
+        self.counts = []
+
+    def add(self, value, times=1):
+        if value >= len(self.counts):
+            self.counts.extend([0] * (value + 1 - len(self.counts)))
+        self.counts[value] += times
+
+    def merge(self, other):
+        for value, times in enumerate(other.counts):
+            if times:
+                self.add(value, times)
+
+    def quantile(self, q):
+        total = sum(self.counts)
+        if not total:
+            return 0
+        target = q * total
+        seen = 0
+        for value, times in enumerate(self.counts):
+            seen += times
+            if seen >= target:
+                return value
+        return len(self.counts) - 1
+
+
+class SweepAggregate:
+    def __init__(self, p_value):
+        self.p_value = p_value
+        self.results = {"R": 0, "B": 0, "Tie": 0}
+        self.moves = RunningStats()
+        self.isolates = RunningStats()
+        self.centrality = RatioStats()
+        self.moves_histogram = IntHistogram()
+        self.isolates_histogram = IntHistogram()
+
+    @property
+    def games(self):
+        return self.moves.count
+
+    def add_game(self, winner, moves, isolates, centrality_count, centrality_total):
+        self.results[winner] += 1
+        self.moves.add(moves)
+        self.isolates.add(isolates)
+        self.moves_histogram.add(moves)
+        self.isolates_histogram.add(isolates)
+        self.centrality.add(centrality_total, centrality_count)
+
+    def merge(self, other):
+        for key, value in other.results.items():
+            self.results[key] += value
+        self.moves.merge(other.moves)
+        self.isolates.merge(other.isolates)
+        self.centrality.merge(other.centrality)
+        self.moves_histogram.merge(other.moves_histogram)
+        self.isolates_histogram.merge(other.isolates_histogram)
+        return self
+
+    def to_row(self):
+        return {
+            "P Value": self.p_value,
+            "Player R Wins": self.results["R"],
+            "Player B Wins": self.results["B"],
+            "Ties": self.results["Tie"],
+            "Avg No. of Moves": self.moves.mean,
+            "Avg Degree Centrality": self.centrality.ratio,
+            "Avg Isolate count": self.isolates.mean,
+            "Moves CI95": self.moves.half_width(),
+            "Degree Centrality CI95": self.centrality.half_width(),
+            "Isolates CI95": self.isolates.half_width(),
+            "Median No. of Moves": self.moves_histogram.quantile(0.5),
+            "P90 No. of Moves": self.moves_histogram.quantile(0.9),
+        }
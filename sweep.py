@@ -0,0 +1,276 @@
+import csv
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import gamestore
+import instrument
+from stats import SweepAggregate
+from analytics import topology_metrics, winning_centrality
+from bitboard import ROWS, COLS, CONNECT, initialize_board, drop_piece, is_dead, is_winning_move, tracks_dead_positions
+from instrument import profiled
+
+FIELDNAMES = [
+    "P Value", "Player R Wins", "Player B Wins", "Ties", "Avg No. of Moves", "Avg Degree Centrality", "Avg Isolate count",
+    "Moves CI95", "Degree Centrality CI95", "Isolates CI95", "Median No. of Moves", "P90 No. of Moves",
+]
+P_VALUES = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+SHARD_SIZE = 10000
+# (rows, cols, connect) of the boards a sweep plays on
+SHAPE = (ROWS, COLS, CONNECT)
+
+
+def play_random_game(board, rng):
+    # (winner, moves, decided): decided is the turn from which no one could
+    # win any more, or None. A game that can only end in a tie stops there
+    # but still counts board.size moves, so sweep rows do not change
+    players = ["R", "B"]
+    turn = 0
+    track_dead = tracks_dead_positions(board)
+
+    while True:
+        if track_dead and is_dead(board):
+            if instrument.ENABLED:
+                instrument.count("dead_positions")
+                instrument.count("moves_skipped", board.size - turn)
+            return "Tie", board.size, turn
+        player = players[turn % 2]
+        column = rng.randrange(board.cols)
+        path_taken = drop_piece(board, column, player, rng)
+        if instrument.ENABLED:
+            instrument.count("drops")
+            instrument.count("drop_path_length", len(path_taken))
+            instrument.count("win_checks")
+
+        if is_winning_move(board, path_taken[-1], player):
+            return player, turn, None
+        turn += 1
+        if turn == board.size:
+            return "Tie", turn, None
+
+
+def simulate_game(p_value, rng, shape=SHAPE):
+    return simulate_board(initialize_board(p_value, rng, *shape), rng)
+
+
+@profiled
+def simulate_board(board, rng):
+    winner, turn, _ = play_random_game(board, rng)
+    isolates = topology_metrics(board).isolates
+    if winner == "Tie":
+        return winner, turn, 0.0, 0, isolates
+
+    centrality_total, centrality_count = winning_centrality(board, winner)
+    return winner, turn, centrality_total, centrality_count, isolates
+
+
+def shard_seed(master_seed, p_value, shard):
+    # string seeds are hashed with sha512, so this is stable across processes
+    return random.Random(f"{master_seed}:{p_value}:{shard}").getrandbits(64)
+
+
+def iter_shard_games(p_value, seed, num_games, shape=SHAPE):
+    rng = random.Random(seed)
+    for _ in range(num_games):
+        # every game gets its own seed so it can be replayed on its own
+        game_seed = rng.getrandbits(64)
+        game_rng = random.Random(game_seed)
+        board = initialize_board(p_value, game_rng, *shape)
+        winner, num_moves, centrality_total, centrality_count, isolates = simulate_board(board, game_rng)
+        if instrument.ENABLED:
+            instrument.end_game(p_value=p_value, seed=game_seed, winner=winner, moves=num_moves, isolates=isolates)
+        yield game_seed, board, winner, num_moves, centrality_total, centrality_count, isolates
+
+
+def run_shard(p_value, seed, num_games, shape=SHAPE):
+    aggregate = SweepAggregate(p_value)
+    for _, _, winner, num_moves, centrality_total, centrality_count, isolates in iter_shard_games(
+            p_value, seed, num_games, shape):
+        aggregate.add_game(winner, num_moves, isolates, centrality_count, centrality_total)
+    return aggregate
+
+
+def run_logged_shard(p_value, seed, num_games, shape=SHAPE):
+    # the aggregate plus every game's encoded moves, for the parent to log
+    import gamelog
+    aggregate = SweepAggregate(p_value)
+    games = []
+    for game_seed, board, winner, num_moves, centrality_total, centrality_count, isolates in iter_shard_games(
+            p_value, seed, num_games, shape):
+        aggregate.add_game(winner, num_moves, isolates, centrality_count, centrality_total)
+        games.append((gamelog.encode_moves(board), winner, p_value, game_seed))
+    return aggregate, games
+
+
+def run_shard_records(p_value, seed, num_games, shape=SHAPE):
+    # one gamestore record per game instead of shard totals
+    return [
+        (p_value, game_seed, gamestore.WINNER_CODES[winner], num_moves, isolates, centrality_count, centrality_total)
+        for game_seed, _, winner, num_moves, centrality_total, centrality_count, isolates
+        in iter_shard_games(p_value, seed, num_games, shape)
+    ]
+
+
+def plan_shards(p_values, num_games, seed, shard_size=SHARD_SIZE, shape=SHAPE):
+    shards = []
+    for p_value in p_values:
+        for shard, start in enumerate(range(0, num_games, shard_size)):
+            shards.append((p_value, shard_seed(seed, p_value, shard), min(shard_size, num_games - start), shape))
+    return shards
+
+
+def merge_shards(p_values, shard_results):
+    # shards are SweepAggregates, so memory stays flat however many games ran
+    totals = {p_value: SweepAggregate(p_value) for p_value in p_values}
+    for aggregate in shard_results:
+        totals[aggregate.p_value].merge(aggregate)
+    return [totals[p_value].to_row() for p_value in p_values]
+
+
+def rows_from_stream(stream_path, p_values):
+    totals = {p_value: SweepAggregate(p_value) for p_value in p_values}
+    for block in gamestore.read_blocks(stream_path):
+        for p_value, winner, moves, isolates, centrality_count, centrality_total in zip(
+                block["p_value"], block["winner"], block["moves"], block["isolates"],
+                block["centrality_count"], block["centrality_total"]):
+            totals[p_value].add_game(gamestore.WINNER_LABELS[winner], moves, isolates, centrality_count, centrality_total)
+    return [totals[p_value].to_row() for p_value in p_values]
+
+
+def run_corpus_shard(corpus_path, start, num_games, seed, connect=CONNECT):
+    # replays corpus boards start .. start + num_games; only the moves are random
+    from corpus import open_corpus
+    boards = open_corpus(corpus_path, connect)
+    aggregate = SweepAggregate(boards.p_value)
+    rng = random.Random(seed)
+    for index in range(start, start + num_games):
+        winner, num_moves, centrality_total, centrality_count, isolates = simulate_board(
+            boards[index], random.Random(rng.getrandbits(64)))
+        aggregate.add_game(winner, num_moves, isolates, centrality_count, centrality_total)
+    return aggregate
+
+
+def run_corpus_sweep(corpus_path, seed=0, workers=None, csv_file_path="connect_four_results.csv",
+                     shard_size=SHARD_SIZE, connect=CONNECT):
+    # every game of the corpus once, so strategies and engines can be compared
+    # on exactly the same boards. numpy is only needed for corpus files
+    from corpus import open_corpus
+    boards = open_corpus(corpus_path, connect)
+    shards = [
+        (start, min(shard_size, len(boards) - start), shard_seed(seed, boards.p_value, shard), connect)
+        for shard, start in enumerate(range(0, len(boards), shard_size))
+    ]
+    aggregate = SweepAggregate(boards.p_value)
+    for result in execute_shards(partial(run_corpus_shard, corpus_path), shards, workers):
+        aggregate.merge(result)
+    rows = [aggregate.to_row()]
+    if instrument.ENABLED:
+        instrument.report()
+    write_rows(csv_file_path, rows)
+    return rows
+
+
+def write_rows(csv_file_path, rows):
+    with open(csv_file_path, mode='w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_instrumented_shard(runner, *shard):
+    # workers send their profile back with the shard so the parent can report
+    return runner(*shard), instrument.take_snapshot()
+
+
+def get_shard_runner(engine, records=False):
+    if engine == "python":
+        return run_shard_records if records else run_shard
+    if engine == "numpy":
+        import batch
+        return batch.run_shard_records if records else batch.run_shard
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+def execute_shards(runner, shards, workers):
+    # yields shard results in plan order, as they complete
+    if not shards:
+        return
+    if instrument.ENABLED:
+        runner = partial(run_instrumented_shard, runner)
+    if workers == 1:
+        yield from collect_results(map(runner, *zip(*shards)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from collect_results(pool.map(runner, *zip(*shards)))
+
+
+def collect_results(results):
+    for result in results:
+        if instrument.ENABLED:
+            result, snapshot = result
+            instrument.merge(snapshot)
+        yield result
+
+
+def stream_sweep(shards, params, workers, stream_path, resume=False, batch_size=4096):
+    # shards finish in plan order, so the checkpoint is just how many are
+    # on disk and how many bytes they fill; resuming truncates anything after
+    checkpoint_path = f"{stream_path}.checkpoint"
+    checkpoint = gamestore.read_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None and checkpoint["params"] != params:
+        raise ValueError(f"{checkpoint_path} belongs to a sweep with different parameters")
+    completed = checkpoint["completed"] if checkpoint else 0
+    truncate_to = checkpoint["bytes"] if checkpoint else None
+
+    runner = get_shard_runner(params["engine"], records=True)
+    with gamestore.GameWriter(stream_path, batch_size, truncate_to) as writer:
+        for records in execute_shards(runner, shards[completed:], workers):
+            writer.extend(records)
+            completed += 1
+            gamestore.write_checkpoint(checkpoint_path, {"params": params, "completed": completed, "bytes": writer.sync()})
+
+
+def log_games(game_log, shard_results, shape=SHAPE):
+    # appends each shard's games as it arrives and passes its aggregate on
+    import gamelog
+    with gamelog.GameRecorder(game_log, shape[0], shape[1]) as recorder:
+        for aggregate, games in shard_results:
+            for game in games:
+                recorder.append(*game)
+            yield aggregate
+
+
+def run_sweep(p_values=P_VALUES, num_games=1_000_000, seed=0, workers=None,
+              csv_file_path="connect_four_results.csv", shard_size=SHARD_SIZE, engine="python",
+              stream_path=None, resume=False, game_log=None, shape=SHAPE):
+    # shards depend only on the seed and shard size, never on the worker
+    # count, so any pool size produces the same rows
+    shards = plan_shards(p_values, num_games, seed, shard_size, tuple(shape))
+
+    # the log formats are checked against the board before any game is played
+    if game_log is not None:
+        import gamelog
+        if engine != "python" or stream_path is not None:
+            raise ValueError("game_log needs the python engine and no stream_path")
+        if shape[0] * shape[1] > gamelog.MAX_NODES:
+            raise ValueError(f"game logs hold boards of up to {gamelog.MAX_NODES} nodes")
+        rows = merge_shards(p_values, log_games(game_log, execute_shards(run_logged_shard, shards, workers), shape))
+    elif stream_path is None:
+        rows = merge_shards(p_values, execute_shards(get_shard_runner(engine), shards, workers))
+    else:
+        if shape[0] * shape[1] > gamestore.MAX_NODES:
+            raise ValueError(f"game streams hold boards of up to {gamestore.MAX_NODES} nodes")
+        params = {"p_values": list(p_values), "num_games": num_games, "seed": seed,
+                  "shard_size": shard_size, "engine": engine, "shape": list(shape)}
+        stream_sweep(shards, params, workers, stream_path, resume)
+        rows = rows_from_stream(stream_path, p_values)
+
+    if instrument.ENABLED:
+        instrument.report()
+
+    write_rows(csv_file_path, rows)
+    return rows
+
+
+if __name__ == "__main__":
+    run_sweep()
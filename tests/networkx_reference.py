@@ -0,0 +1,81 @@
+import random
+
+import networkx as nx
+
+# The networkx board from before the bitboard engine, kept unchanged as the
+# reference the bitboard tests compare against.
+
+
+def initialize_board(p_value):
+    G = nx.DiGraph()
+    for i in range(6):
+        for j in range(6):
+            G.add_node((i, j), piece=None)
+            if i < 5:
+                for k in range(6):
+                    # cerate a random number for the edge
+                    # if random value < p value : then write the edge
+                    a = random.uniform(0.1, 0.9)
+                    if a < p_value:
+                        G.add_edge((i, j), (i + 1, k))
+    return G
+
+
+def drop_piece(G, column, player):
+    path_taken = []
+
+    # First, occupy the specified node
+    node = (0, column)
+    path_taken.append(node)
+
+    # Travel down the graph randomly among unoccupied neighbors
+    while True:
+        neighbors = list(G.neighbors(node))
+        unoccupied_neighbors = [
+            neighbor for neighbor in neighbors if G.nodes[neighbor]["piece"] is None
+        ]
+
+        if not unoccupied_neighbors:
+            break
+
+        chosen_neighbor = random.choice(unoccupied_neighbors)
+        path = nx.shortest_path(G, source=node, target=chosen_neighbor)
+        path_taken.extend(path[1:])
+        node = chosen_neighbor
+
+    G.nodes[path_taken[-1]]["piece"] = player
+
+    return path_taken
+
+
+def is_winner(G, player):
+    for node in G.nodes:
+        if G.nodes[node]["piece"] == player:
+            if check_winning_sequence(G, node, player, set()):
+                return True
+    return False
+
+
+def check_winning_sequence(G, start_node, player, visited):
+    visited.add(start_node)
+
+    if len(visited) == 4:
+        return True
+
+    for neighbor in G.neighbors(start_node):
+        if G.nodes[neighbor]["piece"] == player and neighbor not in visited:
+            if check_winning_sequence(G, neighbor, player, visited.copy()):
+                return True
+
+    return False
+
+
+def get_winning_nodes(G, player):
+    winning_nodes = []
+
+    for node in G.nodes:
+        if G.nodes[node]["piece"] == player:
+            if check_winning_sequence(G, node, player, set()):
+                # print(nx.shortest_path(G, source=node, target=None))
+                winning_nodes.extend(nx.shortest_path(G, source=node, target=None))
+    return winning_nodes
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+import bitboard
+import networkx_reference as reference
+
+SEEDS = range(40)
+
+
+def play_both(seed):
+    # the same seeded game on the networkx board and on the bitboard; the
+    # global random stream is replayed so both draw the same edges and drops
+    p_value = 0.1 + (seed % 9) * 0.1
+    random.seed(seed)
+    G = reference.initialize_board(p_value)
+    random.seed(seed)
+    board = bitboard.initialize_board(p_value)
+    moves = random.Random(seed)
+    for turn in range(bitboard.ROWS * bitboard.COLS):
+        column = moves.randrange(bitboard.COLS)
+        player = bitboard.PLAYERS[turn % 2]
+        state = random.getstate()
+        expected = reference.drop_piece(G, column, player)
+        random.setstate(state)
+        yield G, board, expected, bitboard.drop_piece(board, column, player)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_edges_match_reference(seed):
+    p_value = 0.1 + (seed % 9) * 0.1
+    random.seed(seed)
+    G = reference.initialize_board(p_value)
+    random.seed(seed)
+    board = bitboard.initialize_board(p_value)
+    assert set(bitboard.to_networkx(board).edges) == set(G.edges)
+    assert bitboard.number_of_isolates(board) == reference.nx.number_of_isolates(G)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_games_match_reference(seed):
+    for G, board, expected, path in play_both(seed):
+        assert path == expected
+        for node in G.nodes:
+            assert bitboard.get_piece(board, node) == G.nodes[node]["piece"]
+        for player in bitboard.PLAYERS:
+            assert bitboard.is_winner(board, player) == reference.is_winner(G, player)
+            assert sorted(bitboard.get_winning_nodes(board, player)) == sorted(reference.get_winning_nodes(G, player))
+            for node in G.nodes:
+                if G.nodes[node]["piece"] == player:
+                    assert (bitboard.check_winning_sequence(board, node, player, set())
+                            == reference.check_winning_sequence(G, node, player, set()))
+
+
+@pytest.mark.parametrize("column", [-1, bitboard.COLS, 10 ** 6])
+def test_drop_outside_the_board_raises(column):
+    board = bitboard.initialize_board(0.5, random.Random(0))
+    with pytest.raises(ValueError):
+        bitboard.drop_piece(board, column, "R")
+    assert board.turn == 0
+
+
+def recount_liveness(board):
+    # the liveness counts from scratch: what blocks each path for each player
+    # and how many paths are fully open
+    blocked = {}
+    live = {}
+    for player in bitboard.PLAYERS:
+        closed = ~bitboard.open_nodes(board, player)
+        blocked[player] = [(mask & closed).bit_count() for mask in board.win_paths]
+        live[player] = sum(mask & closed == 0 for mask in board.win_paths)
+    return blocked, live
+
+
+@pytest.mark.parametrize("seed", range(400))
+def test_liveness_follows_moves_and_undos(seed):
+    # moves go on past wins so full columns get their top piece replaced;
+    # every few moves some are taken back
+    rng = random.Random(seed)
+    board = bitboard.initialize_board(0.1 + (seed % 8) * 0.1, rng)
+    bitboard.start_liveness(board)
+    for turn in range(2 * board.size):
+        if board.history and rng.random() < 0.25:
+            bitboard.undo_move(board)
+        else:
+            bitboard.make_move(board, rng.randrange(board.cols), bitboard.PLAYERS[board.turn % 2], rng)
+        assert board.liveness == recount_liveness(board)
+        open_paths = [mask for player in bitboard.PLAYERS for mask in board.win_paths
+                      if mask & bitboard.open_nodes(board, player) == mask]
+        assert bitboard.is_dead(board) == (not open_paths)
+    while board.history:
+        bitboard.undo_move(board)
+        assert board.liveness == recount_liveness(board)
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import gamelog
+import sweep
+from bitboard import initialize_board
+from render import replay_snapshots
+
+
+@pytest.fixture
+def logged_sweep(tmp_path):
+    # p=0.25 mixes games dead from the start (no moves) with played ones
+    path = str(tmp_path / "games.log")
+    sweep.run_sweep((0.1, 0.25), 100, seed=4, workers=1, csv_file_path=str(tmp_path / "rows.csv"),
+                    shard_size=50, game_log=path)
+    return gamelog.GameLog(path)
+
+
+def test_final_landings(logged_sweep):
+    landings = logged_sweep.final_landings()
+    assert len(landings) == len(logged_sweep) == 200
+    assert (logged_sweep.lengths == 0).any() and (logged_sweep.lengths > 0).any()
+    for game in logged_sweep:
+        if len(game.moves):
+            assert landings[game.game_id] == logged_sweep.landings(game.moves)[-1]
+        else:
+            assert landings[game.game_id] == -1
+
+
+def test_games_replay_from_their_seed(logged_sweep):
+    for game in logged_sweep:
+        rng = random.Random(game.topology)
+        board = initialize_board(game.p_value, rng)
+        winner, _, _ = sweep.play_random_game(board, rng)
+        assert winner == game.winner
+        assert [move.path for move in board.history] == [path for _, path in logged_sweep.paths(game.game_id)]
+        assert replay_snapshots(logged_sweep, game.game_id)[-1].pieces == board.pieces
+
+
+def test_recorder_rejects_another_shape(tmp_path):
+    path = str(tmp_path / "games.log")
+    gamelog.GameRecorder(path, 6, 6).close()
+    with pytest.raises(ValueError):
+        gamelog.GameRecorder(path, 7, 6)
+
+
+def test_log_of_a_tall_board(tmp_path):
+    # more than 255 rows needs two-byte path lengths
+    path = str(tmp_path / "tall.log")
+    sweep.run_sweep((0.5,), 4, seed=1, workers=1, csv_file_path=str(tmp_path / "rows.csv"),
+                    game_log=path, shape=(300, 5, 4))
+    log = gamelog.GameLog(path)
+    for game in log:
+        rng = random.Random(game.topology)
+        board = initialize_board(game.p_value, rng, 300, 5, 4)
+        sweep.play_random_game(board, rng)
+        assert [move.path for move in board.history] == [drop for _, drop in log.paths(game.game_id)]
+
+
+def test_sweep_rejects_boards_too_big_to_log(tmp_path):
+    with pytest.raises(ValueError):
+        sweep.run_sweep((0.5,), 1, game_log=str(tmp_path / "big.log"), shape=(300, 300, 4))
+    with pytest.raises(ValueError):
+        sweep.run_sweep((0.5,), 1, stream_path=str(tmp_path / "big.bin"), shape=(300, 300, 4))
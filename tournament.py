@@ -0,0 +1,237 @@
+import csv
+import math
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+
+from bitboard import PLAYERS, initialize_board, make_move, is_winning_move
+from final import suggest_heuristic_move
+from landing import immediate_win_probability
+from montecarlo import estimate_win_probabilities, playable_columns
+from search import Expectimax
+from stats import Z_95, wilson_interval
+from sweep import SHAPE, shard_seed
+from transposition import TranspositionTable
+
+BLOCK_SIZE = 100
+# A pairing is settled once its SETTLE_Z interval on the score excludes 0.5,
+# or is narrower than PRECISION either side. The interval is checked after
+# every block, so it is wider than a one-look 95% interval would be.
+SETTLE_Z = 3.0
+PRECISION = 0.01
+MIN_GAMES = 400
+FIELDNAMES = ["P Value", "Policy A", "Policy B", "Games", "A Wins", "B Wins", "Ties",
+              "A Score", "CI95 Low", "CI95 High", "Settled"]
+
+
+def random_policy(board, player, rng):
+    return rng.randrange(board.cols)
+
+
+def heuristic_policy(board, player, rng):
+    move = suggest_heuristic_move(board, player)
+    return move[0] if move else rng.randrange(board.cols)
+
+
+def greedy_policy(board, player, rng):
+    # the column with the best exact chance of winning on this drop
+    columns = playable_columns(board) or list(range(board.cols))
+    chances = [immediate_win_probability(board, column, player) for column in columns]
+    best = max(chances)
+    return rng.choice([column for column, chance in zip(columns, chances) if chance == best])
+
+
+def montecarlo_policy(board, player, rng):
+    probabilities = estimate_win_probabilities(board, player, rollouts=16, rng=rng)
+    return max(probabilities, key=probabilities.get)
+
+
+def expectimax_policy(board, player, rng):
+    # one ply and a fresh table, so the move never depends on timing
+    # or on earlier games
+    return Expectimax(TranspositionTable(1 << 12)).search(board, player, math.inf, max_depth=1).column
+
+
+POLICIES = {
+    "random": random_policy,
+    "heuristic": heuristic_policy,
+    "greedy": greedy_policy,
+    "montecarlo": montecarlo_policy,
+    "expectimax": expectimax_policy,
+}
+
+
+def play_game(board, red, blue, rng):
+    policies = {"R": POLICIES[red], "B": POLICIES[blue]}
+    turn = 0
+    while True:
+        player = PLAYERS[turn % 2]
+        move = make_move(board, policies[player](board, player, rng), player, rng)
+        if is_winning_move(board, move.node, player):
+            return player
+        turn += 1
+        if turn == board.size:
+            return "Tie"
+
+
+def run_block(first, second, p_value, seed, block, num_pairs, shape=SHAPE):
+    # num_pairs topologies, each played twice with the sides swapped and the
+    # same move seed. Block b draws the same boards for every pairing
+    rng = random.Random(shard_seed(seed, p_value, block))
+    first_wins = second_wins = ties = 0
+    for _ in range(num_pairs):
+        topology = initialize_board(p_value, random.Random(rng.getrandbits(64)), *shape)
+        move_seed = rng.getrandbits(64)
+        for red, blue in ((first, second), (second, first)):
+            winner = play_game(topology.copy(), red, blue, random.Random(move_seed))
+            if winner == "Tie":
+                ties += 1
+            elif (winner == "R") == (red == first):
+                first_wins += 1
+            else:
+                second_wins += 1
+    return first_wins, second_wins, ties
+
+
+class Pairing:
+    def __init__(self, first, second, p_value):
+        self.first = first
+        self.second = second
+        self.p_value = p_value
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+        self.settled = False
+        self.submitted = 0
+        # blocks fold in by index, so where a pairing stops never depends on
+        # which worker finished first
+        self.merged = 0
+        self.waiting = {}
+
+    @property
+    def games(self):
+        return self.wins + self.losses + self.ties
+
+    @property
+    def score(self):
+        return (self.wins + 0.5 * self.ties) / self.games if self.games else 0.5
+
+    def interval(self, z=Z_95):
+        return wilson_interval(self.wins + 0.5 * self.ties, self.games, z)
+
+    def add(self, block, result, min_games=MIN_GAMES):
+        self.waiting[block] = result
+        while not self.settled and self.merged in self.waiting:
+            wins, losses, ties = self.waiting.pop(self.merged)
+            self.wins += wins
+            self.losses += losses
+            self.ties += ties
+            self.merged += 1
+            low, high = self.interval(SETTLE_Z)
+            if self.games >= min_games and (low > 0.5 or high < 0.5 or high - low < 2 * PRECISION):
+                self.settled = True
+
+    def to_row(self):
+        low, high = self.interval()
+        return {
+            "P Value": self.p_value,
+            "Policy A": self.first,
+            "Policy B": self.second,
+            "Games": self.games,
+            "A Wins": self.wins,
+            "B Wins": self.losses,
+            "Ties": self.ties,
+            "A Score": self.score,
+            "CI95 Low": low,
+            "CI95 High": high,
+            "Settled": self.settled,
+        }
+
+
+def bradley_terry(pairings, iterations=1000, tolerance=1e-9):
+    # Elo from a Bradley-Terry fit (Hunter's MM updates), ties as half a win.
+    # Every pairing gets one extra tie so a policy that never scores keeps a
+    # finite rating. Ratings average to 0
+    names = sorted({name for pairing in pairings for name in (pairing.first, pairing.second)})
+    scores = {name: 0.0 for name in names}
+    games = {}
+    for pairing in pairings:
+        scores[pairing.first] += pairing.wins + 0.5 * pairing.ties + 0.5
+        scores[pairing.second] += pairing.losses + 0.5 * pairing.ties + 0.5
+        games[pairing.first, pairing.second] = games[pairing.second, pairing.first] = pairing.games + 1
+
+    strength = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        updated = {
+            name: scores[name] / sum(count / (strength[name] + strength[other])
+                                     for (player, other), count in games.items() if player == name)
+            for name in names
+        }
+        scale = math.exp(sum(math.log(value) for value in updated.values()) / len(names))
+        updated = {name: value / scale for name, value in updated.items()}
+        change = max(abs(updated[name] - strength[name]) for name in names)
+        strength = updated
+        if change < tolerance:
+            break
+    return {name: 400 * math.log10(strength[name]) for name in names}
+
+
+def run_tournament(policies, p_values, max_games=100_000, seed=0, workers=None, block_size=BLOCK_SIZE,
+                   shape=SHAPE, min_games=MIN_GAMES, lookahead=2):
+    # max_games caps each pairing, rounded up to whole blocks of
+    # 2 * block_size games; lookahead blocks per pairing stay in flight
+    pairings = [Pairing(first, second, p_value) for p_value in p_values for first, second in combinations(policies, 2)]
+    max_blocks = max(1, math.ceil(max_games / (2 * block_size)))
+
+    def task(pairing):
+        block = pairing.submitted
+        pairing.submitted += 1
+        return (pairing.first, pairing.second, pairing.p_value, seed, block, block_size, tuple(shape)), block
+
+    if workers == 1:
+        for pairing in pairings:
+            while not pairing.settled and pairing.submitted < max_blocks:
+                args, block = task(pairing)
+                pairing.add(block, run_block(*args), min_games)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+
+            def submit(pairing):
+                args, block = task(pairing)
+                pending[pool.submit(run_block, *args)] = pairing, block
+
+            for pairing in pairings:
+                for _ in range(min(lookahead, max_blocks)):
+                    submit(pairing)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pairing, block = pending.pop(future)
+                    pairing.add(block, future.result(), min_games)
+                    if not pairing.settled and pairing.submitted < max_blocks:
+                        submit(pairing)
+
+    ratings = {p_value: bradley_terry([pairing for pairing in pairings if pairing.p_value == p_value])
+               for p_value in p_values}
+    return pairings, ratings
+
+
+def write_results(csv_file_path, pairings):
+    with open(csv_file_path, mode='w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(pairing.to_row() for pairing in pairings)
+
+
+def print_report(pairings, ratings):
+    for p_value, elo in ratings.items():
+        print(f"p = {p_value}")
+        for pairing in pairings:
+            if pairing.p_value != p_value:
+                continue
+            low, high = pairing.interval()
+            print(f"  {pairing.first:>10} vs {pairing.second:<10} {pairing.games:8d} games  "
+                  f"score {pairing.score:.3f} [{low:.3f}, {high:.3f}]{'' if pairing.settled else '  (not settled)'}")
+        for name, rating in sorted(elo.items(), key=lambda item: -item[1]):
+            print(f"  {name:>10} {rating:+8.1f} Elo")
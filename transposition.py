@@ -0,0 +1,103 @@
+import json
+from collections import OrderedDict, namedtuple
+
+# value is whatever the search stored for the position (an expected score)
+# and depth is how many plies deep that value was searched.
+Entry = namedtuple("Entry", ["key", "depth", "value", "move"])
+
+POLICIES = ("depth", "lru")
+
+
+# Positions are keyed by board.zobrist. "depth" is a fixed array of slots
+# indexed by key where a deeper (or equally deep) result replaces the slot;
+# "lru" keeps the most recently used entries up to capacity.
+class TranspositionTable:
+    def __init__(self, capacity=1 << 20, policy="depth"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    def clear(self):
+        self.size = 0
+        if self.policy == "depth":
+            self.slots = [None] * self.capacity
+        else:
+            self.slots = OrderedDict()
+
+    def __len__(self):
+        return self.size
+
+    def lookup(self, key, depth=0):
+        if self.policy == "depth":
+            entry = self.slots[key % self.capacity]
+            if entry is not None and entry.key != key:
+                entry = None
+        else:
+            entry = self.slots.get(key)
+            if entry is not None:
+                self.slots.move_to_end(key)
+
+        if entry is None or entry.depth < depth:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, value, move=None):
+        entry = Entry(key, depth, value, move)
+        if self.policy == "depth":
+            index = key % self.capacity
+            current = self.slots[index]
+            if current is not None and current.depth > depth:
+                return
+            if current is None:
+                self.size += 1
+            elif current.key != key:
+                self.evictions += 1
+            self.slots[index] = entry
+        else:
+            if key in self.slots:
+                self.slots.move_to_end(key)
+            elif self.size >= self.capacity:
+                self.slots.popitem(last=False)
+                self.evictions += 1
+            else:
+                self.size += 1
+            self.slots[key] = entry
+
+    def entries(self):
+        if self.policy == "depth":
+            return [entry for entry in self.slots if entry is not None]
+        return list(self.slots.values())
+
+    def stats(self):
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def save(self, path, board):
+        # a table is only meaningful for the topology it was filled on
+        with open(path, "w") as table_file:
+            json.dump({
+                "rows": board.rows,
+                "cols": board.cols,
+                "succ": list(board.succ),
+                "capacity": self.capacity,
+                "policy": self.policy,
+                "entries": [list(entry) for entry in self.entries()],
+            }, table_file)
+
+    @classmethod
+    def load(cls, path, board):
+        with open(path) as table_file:
+            data = json.load(table_file)
+        if (data["rows"], data["cols"], tuple(data["succ"])) != (board.rows, board.cols, board.succ):
+            raise ValueError(f"{path} was saved for a different board topology")
+
+        table = cls(data["capacity"], data["policy"])
+        for key, depth, value, move in data["entries"]:
+            table.store(key, depth, value, move)
+        return table